@@ -0,0 +1,183 @@
+import asyncio
+import time
+import numpy
+from deap import tools
+import RandomStreams
+import RunLog
+import SwarmEngine
+
+# Asynchronous (steady-state) particle swarm optimization for objectives whose evaluation time varies a lot.
+# In the generational loop every particle waits for the slowest evaluation of the generation. Here each particle moves and is evaluated again as soon as its own evaluation is done,
+# and the best particle is updated after every evaluation. The evaluations are coroutines run on an asyncio event loop with a limit on how many run at once.
+
+
+def executorEvaluator(func, executor=None):
+    '''
+    Makes an async evaluator out of a normal per-particle objective by running it on an executor.
+
+    :param func: Function taking the (dim,) position of a particle and returning its fitness.
+    :param executor: The concurrent.futures executor to run it on. None uses the event loop's default thread pool.
+    :return: Returns the async evaluator.
+    '''
+
+    async def evaluate(position):
+        return await asyncio.get_running_loop().run_in_executor(executor, func, position)
+    return evaluate
+
+
+def subprocessEvaluator(*command):
+    '''
+    Makes an async evaluator that runs an external solver for each particle.
+    The particle's positions are added to the end of the command and the solver has to print the fitness on stdout.
+
+    :param command: The program and its first arguments.
+    :return: Returns the async evaluator.
+    '''
+
+    async def evaluate(position):
+        process = await asyncio.create_subprocess_exec(*command, *map(repr, position.tolist()), stdout=asyncio.subprocess.PIPE)
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError("%s exited with code %d" % (command[0], process.returncode))
+        return float(stdout)
+    return evaluate
+
+
+def updateOneParticle(swarm, i, phi1, phi2, rng=None):
+    '''
+    Updates the speed and then the position of one particle, the same way SwarmEngine.updateSwarm updates all of them.
+
+    :param swarm: The swarm the particle is in.
+    :param i: The index of the particle.
+    :param phi1: The maximum weight the particle's best position should have on the updated speed
+    :param phi2: The maximum weight the swarm's best position should have on the updated speed
+    :param rng: The run's numpy Generator (see RandomStreams). None uses the random module.
+    '''
+
+    u = SwarmEngine.uniformBlock((swarm.positions.shape[1], 2), rng)
+    position = swarm.positions[i]
+    pull = phi1 * u[:, 0] * (swarm.best_positions[0][i] - position) + phi2 * u[:, 1] * (swarm.gbest_positions[0] - position)
+    swarm.speeds[i] = numpy.clip(swarm.speeds[i] + pull, swarm.smin, swarm.smax)
+    swarm.positions[i] = numpy.clip(position + swarm.speeds[i], swarm.pmin, swarm.pmax)
+
+
+def updateParticleBests(swarm, i, fit):
+    '''
+    Records the fitness of one particle and updates its best position and the best particle found, right away.
+
+    :param swarm: The swarm the particle is in.
+    :param i: The index of the particle.
+    :param fit: The fitness of the particle's current position.
+    '''
+
+    swarm.fitness[i, 0] = fit
+    if fit < swarm.best_fitness[0][i]:
+        swarm.best_positions[0][i] = swarm.positions[i]
+        swarm.best_fitness[0][i] = fit
+    if fit < swarm.gbest_fitness[0]:
+        swarm.gbest_positions[0] = swarm.positions[i]
+        swarm.gbest_fitness[0] = fit
+
+
+def _toFitness(value):
+    '''
+    :param value: What an evaluator returned, a number or a deap style tuple.
+    :return: Returns the first value as a float.
+    '''
+
+    return float(numpy.ravel(value)[0])
+
+
+async def runAsyncSwarm(swarm, evaluate, n_evals, concurrency=8, steadyState=True, phi1=2.0, phi2=2.0, rng=None):
+    '''
+    Runs the single objective particle swarm optimization with async evaluations.
+
+    :param swarm: The swarm being optimized.
+    :param evaluate: Async function taking the (dim,) position of a particle and returning its fitness.
+    :param n_evals: The total number of evaluations to do, in both modes. When it isn't a multiple of n_pop the generational mode's last generation only evaluates the first particles, up to the budget.
+    :param concurrency: The maximum number of evaluations running at once.
+    :param steadyState: Bool for if each particle moves as soon as its own evaluation is done. False waits for the whole population each generation, like singleObj.
+    :param phi1: The maximum weight a particle's best position should have on the updated speed
+    :param phi2: The maximum weight the swarm's best position should have on the updated speed
+    :param rng: The run's numpy Generator (see RandomStreams). None uses the random module. In steady state the order of the updates still depends on when the evaluations finish.
+    :return: Returns the logbook (one line per n_pop evaluations) and a dict with the evaluations done, the wall-clock time, the wall-clock time per evaluation and the worker utilization.
+    '''
+
+    n_pop = len(swarm)
+    semaphore = asyncio.Semaphore(concurrency)
+    logbook = tools.Logbook()
+    logbook.header = ["gen", "evals", "avg", "std", "min", "max", "best"]
+    counts = {"submitted": 0, "done": 0, "busy": 0.0}
+
+    async def evaluateParticle(i):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                return _toFitness(await evaluate(swarm.positions[i].copy()))
+            finally:
+                counts["busy"] += time.perf_counter() - start
+
+    def record():
+        evaluated = swarm.fitness[numpy.isfinite(swarm.fitness[:, 0])] # In steady state a few particles can still be on their first evaluation
+        logbook.record(gen=counts["done"] // n_pop - 1, evals=n_pop, **RunLog.fitnessStats(evaluated), best=swarm.gbest_fitness[0])
+
+    async def particleLoop(i):
+        while counts["submitted"] < n_evals:
+            counts["submitted"] += 1
+            updateParticleBests(swarm, i, await evaluateParticle(i))
+            counts["done"] += 1
+            if counts["done"] % n_pop == 0:
+                record()
+            updateOneParticle(swarm, i, phi1, phi2, rng)
+
+    start = time.perf_counter()
+    if steadyState:
+        await asyncio.gather(*(particleLoop(i) for i in range(n_pop)))
+    else:
+        for _ in range(n_evals // n_pop):
+            swarm.fitness[:, 0] = await asyncio.gather(*(evaluateParticle(i) for i in range(n_pop)))
+            counts["done"] += n_pop
+            SwarmEngine.updateBests(swarm)
+            SwarmEngine.updateSwarm(swarm, phi1, phi2, rng=rng)
+            record()
+
+        # The rest of the budget, like the steady state the evaluations short of a whole population get no logbook line
+        for i, fit in enumerate(await asyncio.gather(*(evaluateParticle(i) for i in range(n_evals % n_pop)))):
+            updateParticleBests(swarm, i, fit)
+            counts["done"] += 1
+    wall = time.perf_counter() - start
+
+    report = {
+        "evals": counts["done"],
+        "wall": wall,
+        "wall_per_eval": wall / max(counts["done"], 1),
+        "utilization": counts["busy"] / (wall * min(concurrency, n_pop)) if wall > 0 else 0.0,
+    }
+    return logbook, report
+
+
+def asyncSingleObj(smin, smax, pmin, pmax, n_pop, n_evals, evaluate, concurrency=8, steadyState=True, size=2, seed=None, phi1=2.0, phi2=2.0):
+    '''
+    Performs the single minimization objective particle swarm optimization with async evaluations, from normal (non-async) code.
+    Inside a notebook or other running event loop, await runAsyncSwarm instead.
+
+    :param smin: The minimum speed for a particle.
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :param n_pop: Number of particles to have in the population
+    :param n_evals: The total number of evaluations to do, the same number in both modes.
+    :param evaluate: Async function taking the (dim,) position of a particle and returning its fitness (see executorEvaluator and subprocessEvaluator).
+    :param concurrency: The maximum number of evaluations running at once.
+    :param steadyState: Bool for if each particle moves as soon as its own evaluation is done, False runs generation by generation for comparison.
+    :param size: The number of dimensions for the particles.
+    :param seed: The seed of the run's own random number stream (see RandomStreams). None draws from the random module.
+    :param phi1: The maximum weight a particle's best position should have on the updated speed
+    :param phi2: The maximum weight the swarm's best position should have on the updated speed
+    :return: Returns the final swarm, the logbook and the report of the run (see runAsyncSwarm).
+    '''
+
+    rng = RandomStreams.makeRng(seed)
+    swarm = SwarmEngine.generateSwarm(n_pop, size, pmin, pmax, smin, smax, rng=rng)
+    logbook, report = asyncio.run(runAsyncSwarm(swarm, evaluate, n_evals, concurrency, steadyState, phi1, phi2, rng))
+    return swarm, logbook, report
@@ -0,0 +1,450 @@
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+import warnings
+import numpy
+from deap import benchmarks
+import Evaluators
+import Observers
+import SwarmEngine
+import Termination
+import VectorBenchmarks
+import VelocityKernels
+
+# Reproducible benchmarks of the swarm: the particle updates, the evaluation loops and full runs, over population sizes, dimensions and objectives.
+# Results are plain dicts written as JSON so they can be stored as a baseline and compared against later to catch regressions.
+# Run from the command line, for example: python Benchmarks.py --quick --out results.json --baseline baseline.json
+
+FULL_POPS = (100, 1000, 10000, 100000, 1000000)
+FULL_DIMS = (2, 10, 100, 1000)
+QUICK_POPS = (100, 1000)
+QUICK_DIMS = (2, 10)
+OBJECTIVES = ("schwefel", "himmelblau", "rastrigin")
+EXECUTORS = ("serial", "thread", "process") # The Evaluators.makeExecutor kinds the chunked evaluation is timed on
+DEAP_OBJECTIVES = {"schwefel": benchmarks.schwefel, "himmelblau": benchmarks.himmelblau, "rastrigin": benchmarks.rastrigin}
+MAX_DEAP_WORK = 2000000 # The per-particle DEAP cases are skipped above this many n_pop * dim, they would take too long
+MAX_ELEMENTS = 20000000 # Grid points above this many n_pop * dim are skipped, the swarm arrays would not fit in memory
+BOUNDS = {"schwefel": (-500, 500, -1, 1), "himmelblau": (-5, 5, -0.5, 0.5), "rastrigin": (-5.12, 5.12, -0.5, 0.5)} # pmin, pmax, smin, smax
+KERNEL_TARGETS = {"schwefel": 1e-3, "himmelblau": 1e-6, "rastrigin": 1e-6} # The fitness the full runs and the velocity kernels have to reach, the objectives' scales are too different for one target
+
+
+def _timeit(func, repeats):
+    '''
+    :param func: The function being timed, called with no arguments.
+    :param repeats: The number of times to call it. The fastest time is kept.
+    :return: Returns the fastest time in seconds.
+    '''
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peakMemory(func):
+    '''
+    :param func: The function being measured, called with no arguments.
+    :return: Returns the peak memory allocated while it ran, in bytes.
+    '''
+
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _deapPopulation(module, n_pop, dim, bestAttrs):
+    '''
+    Makes a population of DEAP particles with their bests already set, ready to be updated.
+
+    :param module: SingleFunctions or MultiFunctions.
+    :param n_pop: Number of particles.
+    :param dim: Number of dimensions.
+    :param bestAttrs: The names of the best position attributes to set on each particle.
+    :return: Returns the list of particles.
+    '''
+
+    generate = module.generateParticle if hasattr(module, "generateParticle") else module.generateParticleMulti
+    pop = [generate(dim, -500, 500, -1, 1) for _ in range(n_pop)]
+    for part in pop:
+        for attr in bestAttrs:
+            setattr(part, attr, list(part))
+    return pop
+
+
+def benchUpdates(n_pop, dim, repeats=3):
+    '''
+    Times one generation of particle updates with the DEAP updateParticle/updateParticleMulti and the SwarmEngine's updateSwarm.
+
+    :param n_pop: Number of particles.
+    :param dim: Number of dimensions.
+    :param repeats: Number of timed repeats, the fastest is kept.
+    :return: Returns the list of result dicts.
+    '''
+
+    import MultiFunctions
+    import SingleFunctions
+
+    results = []
+    if n_pop * dim <= MAX_DEAP_WORK:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore") # creator.create warns when the classes already exist
+            SingleFunctions.makeCreator()
+            MultiFunctions.makeCreatorMulti()
+        pop = _deapPopulation(SingleFunctions, n_pop, dim, ["best"])
+        best = list(pop[0])
+        seconds = _timeit(lambda: [SingleFunctions.updateParticle(part, best, 2.0, 2.0) for part in pop], repeats)
+        results.append(_result("updateParticle", "-", n_pop, dim, seconds))
+        pop = _deapPopulation(MultiFunctions, n_pop, dim, ["best1", "best2"])
+        seconds = _timeit(lambda: [MultiFunctions.updateParticleMulti(part, best, best, 2.0, 2.0) for part in pop], repeats)
+        results.append(_result("updateParticleMulti", "-", n_pop, dim, seconds))
+
+    for n_obj, name in ((1, "updateSwarm"), (2, "updateSwarmMulti")):
+        swarm = SwarmEngine.generateSwarm(n_pop, dim, -500, 500, -1, 1, n_obj)
+        swarm.best_positions[:] = swarm.positions
+        seconds = _timeit(lambda: SwarmEngine.updateSwarm(swarm, 2.0, 2.0), repeats)
+        results.append(_result(name, "-", n_pop, dim, seconds, _peakMemory(lambda: SwarmEngine.updateSwarm(swarm, 2.0, 2.0))))
+    return results
+
+
+def benchEvaluation(objective, n_pop, dim, repeats=3):
+    '''
+    Times scoring a population one particle at a time with deap.benchmarks and in one call with VectorBenchmarks.
+
+    :param objective: The name of the objective.
+    :param n_pop: Number of particles.
+    :param dim: Number of dimensions.
+    :param repeats: Number of timed repeats, the fastest is kept.
+    :return: Returns the list of result dicts.
+    '''
+
+    positions = numpy.random.default_rng(0).uniform(-5, 5, (n_pop, dim))
+    results = []
+    if n_pop * dim <= MAX_DEAP_WORK:
+        rows = positions.tolist()
+        func = DEAP_OBJECTIVES[objective]
+        results.append(_result("evaluateDeap", objective, n_pop, dim, _timeit(lambda: [func(row) for row in rows], repeats)))
+    func = VectorBenchmarks.getObjective(objective)
+    results.append(_result("evaluateVectorized", objective, n_pop, dim, _timeit(lambda: func(positions), repeats), _peakMemory(lambda: func(positions))))
+    return results
+
+
+def benchExecutors(objective, n_pop, dim, executors, repeats=3):
+    '''
+    Times scoring a population through Evaluators.ChunkedEvaluator on each executor, with the per-particle deap.benchmarks function and the VectorBenchmarks one.
+
+    :param objective: The name of the objective.
+    :param n_pop: Number of particles.
+    :param dim: Number of dimensions.
+    :param executors: Dict of the executors by their Evaluators.makeExecutor kind, made once for the whole suite so the pools' start up is not timed.
+    :param repeats: Number of timed repeats, the fastest is kept.
+    :return: Returns the list of result dicts.
+    '''
+
+    positions = numpy.random.default_rng(0).uniform(-5, 5, (n_pop, dim))
+    results = []
+    for kind, executor in executors.items():
+        if n_pop * dim <= MAX_DEAP_WORK:
+            evaluate = Evaluators.ChunkedEvaluator(DEAP_OBJECTIVES[objective], executor, vectorized=False)
+            results.append(_result("evaluateDeap_" + kind, objective, n_pop, dim, n_pop / Evaluators.timeEvaluator(evaluate, positions, repeats)))
+        evaluate = Evaluators.ChunkedEvaluator(VectorBenchmarks.getObjective(objective), executor)
+        results.append(_result("evaluateVectorized_" + kind, objective, n_pop, dim, n_pop / Evaluators.timeEvaluator(evaluate, positions, repeats)))
+    return results
+
+
+def _timeRun(case, objective, n_pop, dim, n_gen, target, run, reachedTarget):
+    '''
+    Times a full run and how long it took to reach the target fitness.
+
+    :param case: The name of the case.
+    :param objective: The name of the objective.
+    :param n_pop: Number of particles.
+    :param dim: Number of dimensions.
+    :param n_gen: Number of generations.
+    :param target: The fitness to reach, recorded with the result. None skips the time-to-target measurement.
+    :param run: Function taking the list of observers, running and returning the best fitness found.
+    :param reachedTarget: Function taking the last logbook row, True once the target is reached.
+    :return: Returns the list with the result dict.
+    '''
+
+    reached = {}
+
+    class TargetObserver(Observers.Observer):
+        def start(self, pop):
+            reached["start"] = time.perf_counter()
+
+        def generation(self, generation, pop, best, logbook):
+            if target is not None and "time" not in reached and reachedTarget(logbook[-1]):
+                reached["time"] = time.perf_counter() - reached["start"]
+                reached["evals"] = (generation + 1) * n_pop
+
+    def timed():
+        reached["best"] = run([TargetObserver()])
+
+    seconds = _timeit(timed, 1)
+    result = _result(case, objective, n_pop, dim, seconds / n_gen, _peakMemory(timed))
+    result.update(n_gen=n_gen, best=reached["best"], target=target,
+                  time_to_target=reached.get("time"), evals_to_target=reached.get("evals"))
+    return [result]
+
+
+def benchRun(objective, n_pop, dim, n_gen, target=None, seed=0):
+    '''
+    Times a full SwarmEngine run and how long it took to reach the target fitness.
+
+    :param objective: The name of the objective.
+    :param n_pop: Number of particles.
+    :param dim: Number of dimensions.
+    :param n_gen: Number of generations.
+    :param target: The fitness to reach. None skips the time-to-target measurement.
+    :param seed: The seed of the random module, so the runs are reproducible.
+    :return: Returns the list with the result dict.
+    '''
+
+    bounds = BOUNDS[objective]
+
+    def run(observers):
+        random.seed(seed)
+        swarm, logbook = SwarmEngine.singleObjVectorized(bounds[2], bounds[3], bounds[0], bounds[1], n_pop, n_gen, False, size=dim,
+                                                         evaluate=objective, observers=observers)
+        return float(swarm.gbest_fitness[0])
+
+    return _timeRun("run", objective, n_pop, dim, n_gen, target, run, lambda row: row["min"] <= target)
+
+
+def benchDeapRun(objective, n_pop, n_gen, target=None, seed=0):
+    '''
+    Times a full run of the DEAP driver behind the notebook's singleObj (SingleFunctions.runSingleObj) and how long it took to reach the target fitness.
+    The DEAP particles have 2 dimensions, and populations above MAX_DEAP_WORK values are skipped.
+
+    :param objective: The name of the objective.
+    :param n_pop: Number of particles.
+    :param n_gen: Number of generations.
+    :param target: The fitness to reach. None skips the time-to-target measurement.
+    :param seed: The seed of the random module, so the runs are reproducible.
+    :return: Returns the list with the result dict, empty when skipped.
+    '''
+
+    import SingleFunctions
+
+    if n_pop * 2 > MAX_DEAP_WORK:
+        return []
+    bounds = BOUNDS[objective]
+
+    def run(observers):
+        random.seed(seed)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore") # creator.create warns when the classes already exist
+            pop, best, logbook = SingleFunctions.runSingleObj(bounds[2], bounds[3], bounds[0], bounds[1], n_pop, n_gen, False, observers=observers,
+                                                              objective=None if objective == "schwefel" else objective)
+        return best.fitness.values[0]
+
+    return _timeRun("run_deap_single", objective, n_pop, 2, n_gen, target, run, lambda row: row["min"] <= target)
+
+
+def benchDeapMultiRun(n_pop, n_gen, targets, seed=0):
+    '''
+    Times a full run of the DEAP driver behind the notebook's multiObj (MultiFunctions.runMultiObj, Himmelblau and Rastrigin) and how long it took to reach both targets.
+    The DEAP particles have 2 dimensions, and populations above MAX_DEAP_WORK values are skipped.
+
+    :param n_pop: Number of particles.
+    :param n_gen: Number of generations.
+    :param targets: Dict of the fitness to reach for "himmelblau" and "rastrigin".
+    :param seed: The seed of the random module, so the runs are reproducible.
+    :return: Returns the list with the result dict, empty when skipped.
+    '''
+
+    import MultiFunctions
+
+    if n_pop * 2 > MAX_DEAP_WORK:
+        return []
+    target = [targets["himmelblau"], targets["rastrigin"]]
+    pmin, pmax, smin, smax = BOUNDS["himmelblau"]
+
+    def run(observers):
+        random.seed(seed)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pop, (best1, best2), logbook = MultiFunctions.runMultiObj(smin, smax, pmin, pmax, n_pop, n_gen, False, observers=observers)
+        return [best1.fitness.values[0], best2.fitness.values[0]]
+
+    return _timeRun("run_deap_multi", "himmelblau+rastrigin", n_pop, 2, n_gen, target, run,
+                    lambda row: row["min1"] <= target[0] and row["min2"] <= target[1])
+
+
+def benchKernels(objective, dim, n_pop=50, n_gen=1000, target=None, seeds=10, kernels=tuple(VelocityKernels.KERNELS)):
+    '''
+    Counts the evaluations each velocity kernel needs to reach the target fitness, over several seeds.
+    The speeds are limited to 20% of the width of the space. The constriction kernel runs with phi1 = phi2 = 2.05, the others with 2.0.
+
+    :param objective: The name of the objective.
+    :param dim: Number of dimensions.
+    :param n_pop: Number of particles.
+    :param n_gen: The most generations a run can take to reach the target.
+    :param target: The fitness to reach. None uses the one in KERNEL_TARGETS.
+    :param seeds: The number of seeds each kernel is run with.
+    :param kernels: The names of the kernels, "none" is the original update.
+    :return: Returns the list of result dicts, one per kernel, with the fraction of the runs that reached the target, the median evaluations they took and the median best fitness of all the runs.
+    '''
+
+    pmin, pmax = BOUNDS[objective][:2]
+    smax = 0.2 * (pmax - pmin)
+    target = KERNEL_TARGETS[objective] if target is None else target
+    results = []
+    for name in kernels:
+        phi = 2.05 if name == "constriction" else 2.0
+        evals = []
+        bests = []
+        generations = 0
+        start = time.perf_counter()
+        for seed in range(seeds):
+            stop = Termination.StopCriteria(target=target)
+            swarm, logbook = SwarmEngine.singleObjVectorized(-smax, smax, pmin, pmax, n_pop, n_gen, False, size=dim, evaluate=objective, stop=stop,
+                                                             phi1=phi, phi2=phi, seed=seed, kernel=None if name == "none" else name)
+            bests.append(float(swarm.gbest_fitness[0]))
+            generations += stop.generation + 1
+            if stop.reason == "target":
+                evals.append((stop.generation + 1) * n_pop)
+        seconds = time.perf_counter() - start
+        result = _result("kernel_" + name, objective, n_pop, dim, seconds / generations)
+        result.update(kernel=name, target=target, runs=seeds, reached=len(evals) / seeds,
+                      evals_to_target=float(numpy.median(evals)) if evals else None, best=float(numpy.median(bests)))
+        results.append(result)
+    return results
+
+
+def _result(case, objective, n_pop, dim, seconds, peak=None):
+    '''
+    :return: Returns the result dict of one measurement. The throughput is particles per second.
+    '''
+
+    return {"case": case, "objective": objective, "n_pop": n_pop, "dim": dim, "seconds": seconds,
+            "throughput": n_pop / seconds if seconds > 0 else float("inf"), "peak_bytes": peak}
+
+
+def runSuite(pops=QUICK_POPS, dims=QUICK_DIMS, objectives=OBJECTIVES, n_gen=20, targets=None, repeats=3, kernels=False, kernelGens=1000, executors=EXECUTORS, workers=None):
+    '''
+    Runs every benchmark over the grid of population sizes, dimensions and objectives.
+
+    :param pops: The population sizes.
+    :param dims: The dimensions. Himmelblau only uses the first two. Combinations with more than MAX_ELEMENTS values are skipped.
+    :param objectives: The names of the objectives.
+    :param n_gen: Number of generations of the full runs. The DEAP runs (run_deap_single/run_deap_multi) are only made for 2 dimensions.
+    :param targets: Dict of the fitness the full runs and the velocity kernels try to reach for each objective, the missing ones are taken from KERNEL_TARGETS.
+    :param repeats: Number of timed repeats, the fastest is kept.
+    :param kernels: Bool for if the velocity kernels are compared too (see benchKernels), for each objective and dimension.
+    :param kernelGens: The most generations a run of the kernel comparison can take to reach its target.
+    :param executors: The Evaluators.makeExecutor kinds the chunked evaluation is timed on (see benchExecutors). Empty skips them.
+    :param workers: The number of threads/processes of the executors, None for the number of cores.
+    :return: Returns the dict with the machine info and the list of results.
+    '''
+
+    targets = {**KERNEL_TARGETS, **(targets or {})}
+    results = []
+    pools = {kind: Evaluators.makeExecutor(kind, workers) for kind in executors}
+    try:
+        for n_pop in pops:
+            for dim in dims:
+                if n_pop * dim > MAX_ELEMENTS:
+                    continue
+                results += benchUpdates(n_pop, dim, repeats)
+                for objective in objectives:
+                    results += benchEvaluation(objective, n_pop, dim, repeats)
+                    if pools:
+                        results += benchExecutors(objective, n_pop, dim, pools, repeats)
+                    results += benchRun(objective, n_pop, dim, n_gen, targets[objective])
+                    if dim == 2:
+                        results += benchDeapRun(objective, n_pop, n_gen, targets[objective])
+                if dim == 2:
+                    results += benchDeapMultiRun(n_pop, n_gen, targets)
+    finally:
+        for pool in pools.values():
+            if pool is not None:
+                pool.shutdown()
+    if kernels:
+        for objective in objectives:
+            for dim in dims:
+                results += benchKernels(objective, dim, n_gen=kernelGens, target=targets[objective])
+    return {"machine": platform.platform(), "python": platform.python_version(), "numpy": numpy.__version__, "results": results}
+
+
+def _key(result):
+    return (result["case"], result["objective"], result["n_pop"], result["dim"])
+
+
+def compareToBaseline(suite, baseline, tolerance=0.2):
+    '''
+    Finds the cases whose throughput dropped by more than the tolerance compared to a baseline.
+
+    :param suite: The results of runSuite.
+    :param baseline: The results of an earlier runSuite, like a stored baseline file.
+    :param tolerance: The fraction of the baseline throughput that can be lost before it counts as a regression.
+    :return: Returns the list of (case key, baseline throughput, new throughput) for each regression.
+    '''
+
+    old = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in suite["results"]:
+        before = old.get(_key(result))
+        if before is not None and result["throughput"] < (1 - tolerance) * before["throughput"]:
+            regressions.append((_key(result), before["throughput"], result["throughput"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the particle swarm optimization.")
+    parser.add_argument("--quick", action="store_true", help="only the small populations/dimensions")
+    parser.add_argument("--pops", type=int, nargs="+", help="population sizes to run")
+    parser.add_argument("--dims", type=int, nargs="+", help="dimensions to run")
+    parser.add_argument("--objectives", nargs="+", default=list(OBJECTIVES))
+    parser.add_argument("--gens", type=int, default=20, help="generations of the full runs")
+    parser.add_argument("--target", nargs="+", default=[], metavar="OBJECTIVE=FITNESS", help="fitness the full runs and the kernels try to reach for an objective, for example schwefel=1e-3 (defaults in KERNEL_TARGETS)")
+    parser.add_argument("--kernels", action="store_true", help="also compare the evaluations the velocity kernels need to reach a target")
+    parser.add_argument("--kernel-gens", type=int, default=1000, help="most generations of the kernel comparison runs")
+    parser.add_argument("--executors", nargs="*", default=list(EXECUTORS), choices=EXECUTORS, help="executors the chunked evaluation is timed on, none to skip them")
+    parser.add_argument("--workers", type=int, help="threads/processes of the executors")
+    parser.add_argument("--out", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop against the baseline")
+    args = parser.parse_args(argv)
+
+    targets = {}
+    for item in args.target:
+        name, _, value = item.partition("=")
+        try:
+            targets[name] = float(value)
+        except ValueError:
+            parser.error("--target takes OBJECTIVE=FITNESS, got %r" % item)
+        if name not in KERNEL_TARGETS:
+            parser.error("Unknown objective %r in --target, the known ones are: %s" % (name, ", ".join(sorted(KERNEL_TARGETS))))
+    pops = args.pops or (QUICK_POPS if args.quick else FULL_POPS)
+    dims = args.dims or (QUICK_DIMS if args.quick else FULL_DIMS)
+    suite = runSuite(pops, dims, args.objectives, args.gens, targets, kernels=args.kernels, kernelGens=args.kernel_gens,
+                     executors=args.executors, workers=args.workers)
+    for result in suite["results"]:
+        print("%-26s %-10s n_pop=%-8d dim=%-5d %14.1f particles/s" % (_key(result) + (result["throughput"],)))
+    for result in suite["results"]:
+        if "kernel" in result:
+            print("%-26s %-10s dim=%-5d reached %3.0f%%  evals to target %8s  median best %.4g" % (result["case"], result["objective"], result["dim"], 100 * result["reached"],
+                  "-" if result["evals_to_target"] is None else "%d" % result["evals_to_target"], result["best"]))
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(suite, file, indent=1)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compareToBaseline(suite, json.load(file), args.tolerance)
+        for key, before, after in regressions:
+            print("REGRESSION %s: %.1f -> %.1f particles/s" % (key, before, after))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+import os
+import pickle
+import random
+import numpy
+
+# Checkpoints of a run's state so a long run can be resumed after the process dies.
+# A checkpoint is one uncompressed .npz file: the raw arrays of the swarm plus a small pickled header with the generation, the random module's state (and the run's Generator state) and the logbook.
+# It is written to a temporary file first and then renamed, so a crash while writing never leaves a broken checkpoint behind.
+
+
+def saveCheckpoint(path, arrays, generation, logbook, rng=None):
+    '''
+    Writes the state of a run to a checkpoint file.
+
+    :param path: The checkpoint file (.npz).
+    :param arrays: Dict of the numpy arrays making up the swarm's state.
+    :param generation: The last generation that was completed.
+    :param logbook: The logbook of the run so far.
+    :param rng: The run's numpy Generator (see RandomStreams), None if the run draws from the random module.
+    '''
+
+    header = pickle.dumps({"generation": generation, "random_state": random.getstate(), "logbook": logbook,
+                           "rng_state": rng.bit_generator.state if rng is not None else None}, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as file:
+        numpy.savez(file, _header=numpy.frombuffer(header, dtype=numpy.uint8), **arrays)
+    os.replace(tmp, path)
+
+
+def loadCheckpoint(path, rng=None):
+    '''
+    Reads a checkpoint file and puts the random module (and the run's Generator) back in the state it was in when the checkpoint was written.
+
+    :param path: The checkpoint file (.npz).
+    :param rng: The run's numpy Generator, its state is set to the saved one. None if the run draws from the random module.
+    :return: Returns the dict of arrays, the last generation that was completed and the logbook.
+    '''
+
+    with numpy.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files if name != "_header"}
+        header = pickle.loads(data["_header"].tobytes())
+    random.setstate(header["random_state"])
+    if rng is not None and header.get("rng_state") is not None:
+        rng.bit_generator.state = header["rng_state"]
+    return arrays, header["generation"], header["logbook"]
+
+
+def shouldCheckpoint(checkpointPath, checkpointInterval, generation, n_gen):
+    '''
+    :param checkpointPath: The checkpoint file, None when checkpointing is off.
+    :param checkpointInterval: The number of generations between checkpoints.
+    :param generation: The generation that was just completed.
+    :param n_gen: The total number of generations of the run.
+    :return: Returns True if a checkpoint should be written after this generation. The last generation is always written.
+    '''
+
+    if checkpointPath is None or checkpointInterval <= 0:
+        return False
+    return (generation + 1) % checkpointInterval == 0 or generation + 1 == n_gen
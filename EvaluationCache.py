@@ -0,0 +1,132 @@
+from collections import OrderedDict
+import numpy
+
+# Memoization of fitness evaluations. With tight speed limits and positions clamped at pmin/pmax many particles land on the same coordinates,
+# so an expensive objective does not need to be evaluated again for a position it has already scored.
+
+
+class CachedEvaluator:
+    '''
+    Wraps a function scoring a (n_pop, dim) population with a bounded LRU cache of the fitness of the positions it has seen.
+    Positions can be quantized so particles closer together than the quantum share one cache entry.
+    '''
+
+    def __init__(self, func, maxsize=100000, quantum=None):
+        '''
+        :param func: Function taking the (n, dim) positions and returning the (n,) or (n, n_obj) fitness.
+        :param maxsize: The maximum number of positions kept. The least recently used ones are dropped first.
+        :param quantum: The grid size positions are rounded to for the cache keys. None only matches exactly equal positions.
+        '''
+
+        if maxsize < 1:
+            raise ValueError("The cache needs room for at least one position, got maxsize=%r" % maxsize)
+        if quantum is not None and quantum <= 0:
+            raise ValueError("The quantum has to be positive, got %r" % quantum)
+        self.func = func
+        self.maxsize = maxsize
+        self.quantum = quantum
+        self.hits = 0
+        self.misses = 0
+        self._store = OrderedDict()
+
+    def _keys(self, positions):
+        '''
+        Makes the cache key of every row: the raw bytes of the (quantized) position.
+
+        :param positions: The (n, dim) float positions.
+        :return: Returns the list of keys.
+        '''
+
+        if self.quantum is not None:
+            positions = numpy.round(positions / self.quantum).astype(numpy.int64)
+        rows = numpy.ascontiguousarray(positions)
+        return rows.view(numpy.dtype((numpy.void, rows.dtype.itemsize * rows.shape[1]))).ravel().tolist()
+
+    def __call__(self, positions):
+        '''
+        :param positions: The (n_pop, dim) positions of the particles being examined
+        :return: Returns the fitness array, only evaluating the positions that are not cached yet (in one call).
+        '''
+
+        positions = numpy.ascontiguousarray(positions, dtype=float)
+        keys = self._keys(positions)
+        values = [None] * len(keys)
+        missing = OrderedDict() # The first row with each uncached key, duplicates in the same population are only evaluated once
+        for i, key in enumerate(keys):
+            value = self._store.get(key)
+            if value is not None:
+                self._store.move_to_end(key)
+                values[i] = value
+                self.hits += 1
+            elif key in missing:
+                self.hits += 1
+            else:
+                missing[key] = i
+
+        if missing:
+            fitness = numpy.asarray(self.func(positions[list(missing.values())]), dtype=float)
+            self.misses += len(missing)
+            fresh = dict(zip(missing, fitness))
+            for key, value in fresh.items():
+                self._store[key] = value
+            while len(self._store) > self.maxsize:
+                self._store.popitem(last=False)
+            for i, key in enumerate(keys):
+                if values[i] is None:
+                    values[i] = fresh[key]
+        return numpy.array(values, dtype=float)
+
+    def single(self, individual):
+        '''
+        Scores one particle through the cache, with the same tuple return as the deap.benchmarks functions.
+
+        :param individual: The positions of the particle.
+        :return: Returns the tuple of fitness values.
+        '''
+
+        return tuple(numpy.atleast_1d(self(numpy.array([individual], dtype=float))[0]).tolist())
+
+    def counters(self, suffix=""):
+        '''
+        :param suffix: Put after the names, to tell apart the caches of different objectives in one logbook.
+        :return: Returns the dict of hits/misses so far, to be recorded in the logbook.
+        '''
+
+        return {"hits" + suffix: self.hits, "misses" + suffix: self.misses}
+
+    def state(self, prefix="cache"):
+        '''
+        :param prefix: Put before the names of the arrays, to tell apart the caches of different objectives in one checkpoint.
+        :return: Returns the dict of arrays holding the cached positions (least recently used first), their fitness and the hits/misses, for checkpoints.
+        '''
+
+        keys = list(self._store)
+        width = len(keys[0]) if keys else 0
+        return {prefix + "_keys": numpy.frombuffer(b"".join(keys), dtype=numpy.uint8).reshape(len(keys), width),
+                prefix + "_values": numpy.array(list(self._store.values()), dtype=float),
+                prefix + "_counters": numpy.array([self.hits, self.misses], dtype=numpy.int64)}
+
+    def setState(self, arrays, prefix="cache"):
+        '''
+        Puts the cache back in the state it was in when a checkpoint was written. Does nothing if the checkpoint has no cache.
+
+        :param arrays: The dict of arrays of the checkpoint, with the ones from state among them.
+        :param prefix: The prefix given to state.
+        '''
+
+        if prefix + "_keys" not in arrays:
+            return
+        self._store = OrderedDict(zip((row.tobytes() for row in arrays[prefix + "_keys"]), arrays[prefix + "_values"]))
+        self.hits, self.misses = (int(value) for value in arrays[prefix + "_counters"])
+
+    def clear(self):
+        '''
+        Forgets every cached position and resets the counters.
+        '''
+
+        self._store.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._store)
@@ -0,0 +1,106 @@
+import os
+import time
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
+# Pluggable evaluation of a whole population for expensive objectives.
+# The population is cut into chunks of rows which are sent to the workers as plain numpy arrays (not creator.Particle objects) and the results are put back together in order.
+
+
+def _evaluateChunk(func, vectorized, chunk):
+    '''
+    Scores one chunk of particles. This is what runs on the workers so it has to be a top-level function for process pools.
+
+    :param func: The objective function.
+    :param vectorized: Bool for if func takes the whole (n, dim) chunk at once instead of one particle at a time
+    :param chunk: The (n, dim) positions of the particles in this chunk
+    :return: Returns the (n,) or (n, n_obj) fitness array of the chunk.
+    '''
+
+    if vectorized:
+        return numpy.asarray(func(chunk), dtype=float)
+    return numpy.array([func(row) for row in chunk.tolist()], dtype=float).reshape(len(chunk), -1)
+
+
+def makeExecutor(kind, workers=None):
+    '''
+    Makes the executor the population is evaluated on.
+
+    :param kind: "serial", "thread" or "process"
+    :param workers: The number of threads/processes to use. Defaults to the number of cores.
+    :return: Returns the concurrent.futures executor, or None for serial evaluation.
+    '''
+
+    if kind == "serial":
+        return None
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError("Unknown executor kind %r, use 'serial', 'thread' or 'process'" % kind)
+
+
+class ChunkedEvaluator:
+    '''
+    Scores a (n_pop, dim) population with an objective function, in chunks spread over an executor.
+    Can be registered on the toolbox as the batch evaluation or passed as the evaluate function of the SwarmEngine.
+    '''
+
+    def __init__(self, func, executor=None, vectorized=True, n_chunks=None):
+        '''
+        :param func: The objective function. For process pools it has to be picklable (defined at the top level of a module).
+        :param executor: The concurrent.futures executor to run the chunks on. None evaluates everything in this thread.
+        :param vectorized: Bool for if func takes a whole (n, dim) array at once (like VectorBenchmarks) instead of one particle at a time (like deap.benchmarks)
+        :param n_chunks: How many chunks the population is cut into. Defaults to 4 per core so slow chunks are balanced out.
+        '''
+
+        self.func = func
+        self.executor = executor
+        self.vectorized = vectorized
+        self.n_chunks = n_chunks if n_chunks is not None else 4 * (os.cpu_count() or 1)
+
+    def __call__(self, positions):
+        '''
+        :param positions: The (n_pop, dim) positions of the particles being examined
+        :return: Returns the (n_pop,) fitness array, or (n_pop, n_obj) if the objective gives more than one value.
+        '''
+
+        positions = numpy.ascontiguousarray(positions, dtype=float)
+        if self.executor is None:
+            fitness = _evaluateChunk(self.func, self.vectorized, positions)
+        else:
+            chunks = numpy.array_split(positions, min(self.n_chunks, len(positions)) or 1)
+            results = self.executor.map(_evaluateChunk, [self.func] * len(chunks), [self.vectorized] * len(chunks), chunks) # map keeps the results in order
+            fitness = numpy.concatenate(list(results))
+        if fitness.ndim == 2 and fitness.shape[1] == 1:
+            fitness = fitness[:, 0]
+        return fitness
+
+    def single(self, individual):
+        '''
+        Scores one particle, with the same tuple return as the deap.benchmarks functions.
+
+        :param individual: The positions of the particle.
+        :return: Returns the tuple of fitness values.
+        '''
+
+        return tuple(numpy.atleast_1d(self(numpy.array([individual], dtype=float))[0]).tolist())
+
+
+def timeEvaluator(evaluate, positions, repeats=3):
+    '''
+    Times how fast an evaluation function scores a population, used to compare the executors against the serial path.
+
+    :param evaluate: The function scoring the (n_pop, dim) positions.
+    :param positions: The positions being scored.
+    :param repeats: How many times to score the positions. The fastest time is kept.
+    :return: Returns the number of particles evaluated per second.
+    '''
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        evaluate(positions)
+        best = min(best, time.perf_counter() - start)
+    return len(positions) / best
@@ -0,0 +1,175 @@
+import multiprocessing
+import queue
+import time
+import numpy
+from multiprocessing import shared_memory
+from deap import tools
+import RandomStreams
+import SwarmEngine
+import VectorBenchmarks
+
+# Island model: several independent swarms run in their own processes and every few generations send their best particles to the next island in a ring.
+# The migrants are swapped through one shared memory block so nothing is pickled while the islands are running.
+
+
+def _emigrate(swarm, slot, slot_fitness):
+    '''
+    Writes the best personal best positions of the swarm into this island's slot of the shared migrant block.
+
+    :param swarm: The island's swarm.
+    :param slot: The (n_migrants, dim) shared positions of this island's migrants.
+    :param slot_fitness: The (n_migrants,) shared fitness of this island's migrants.
+    '''
+
+    order = numpy.argsort(swarm.best_fitness[0], kind="stable")[:len(slot)]
+    slot[:] = swarm.best_positions[0][order]
+    slot_fitness[:] = swarm.best_fitness[0][order]
+
+
+def _immigrate(swarm, slot, slot_fitness):
+    '''
+    Replaces the worst particles of the swarm with the migrants of the previous island.
+    The migrants become both the current position and the personal best of the particles they replace.
+
+    :param swarm: The island's swarm.
+    :param slot: The (n_migrants, dim) shared positions of the incoming migrants.
+    :param slot_fitness: The (n_migrants,) shared fitness of the incoming migrants.
+    '''
+
+    worst = numpy.argsort(swarm.best_fitness[0], kind="stable")[::-1][:len(slot)]
+    swarm.positions[worst] = slot
+    swarm.best_positions[0][worst] = slot
+    swarm.best_fitness[0][worst] = slot_fitness
+    i = numpy.argmin(slot_fitness)
+    if slot_fitness[i] < swarm.gbest_fitness[0]:
+        swarm.gbest_positions[0] = slot[i]
+        swarm.gbest_fitness[0] = slot_fitness[i]
+
+
+def _runIsland(island, n_islands, shm_name, n_migrants, params, results, barrier):
+    '''
+    Runs one island in its own process and puts its logbook and best particle on the results queue.
+
+    :param island: The index of this island.
+    :param n_islands: The total number of islands.
+    :param shm_name: The name of the shared memory block the migrants are swapped through.
+    :param n_migrants: The number of particles sent to the next island at each migration.
+    :param params: Dict of the swarm settings (see runIslands).
+    :param results: The queue the island's results are put on.
+    :param barrier: The barrier keeping the islands in step at each migration.
+    '''
+
+    dim = params["size"]
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        block = numpy.ndarray((n_islands, n_migrants, dim + 1), dtype=float, buffer=shm.buf) # Positions then fitness for each migrant
+        rng = RandomStreams.stream(params["seed"], island) # Each island gets its own stream of random numbers
+        evaluate = params["evaluate"]
+        if isinstance(evaluate, str):
+            evaluate = VectorBenchmarks.getObjective(evaluate)
+
+        swarm = SwarmEngine.generateSwarm(params["n_pop"], dim, params["pmin"], params["pmax"], params["smin"], params["smax"], rng=rng)
+        logbook = tools.Logbook()
+        logbook.header = ["gen", "evals", "avg", "std", "min", "max", "best"]
+        interval = params["migrationInterval"]
+        start = time.perf_counter()
+        for generation in range(params["n_gen"]):
+            if params["bestPerGen"]:
+                swarm.resetGlobalBest()
+            SwarmEngine.evaluateSwarm(swarm, evaluate)
+            SwarmEngine.updateBests(swarm)
+            SwarmEngine.updateSwarm(swarm, params["phi1"], params["phi2"], rng=rng)
+            SwarmEngine.recordStats(logbook, swarm, generation)
+            logbook[-1]["best"] = swarm.gbest_fitness[0]
+
+            # Every few generations the islands publish their best particles, wait for each other, then take in the previous island's
+            if n_islands > 1 and interval and (generation + 1) % interval == 0 and generation + 1 < params["n_gen"]:
+                _emigrate(swarm, block[island, :, :dim], block[island, :, dim])
+                barrier.wait()
+                source = (island - 1) % n_islands
+                _immigrate(swarm, block[source, :, :dim].copy(), block[source, :, dim].copy())
+                barrier.wait()
+        elapsed = time.perf_counter() - start
+        del block
+        results.put((island, logbook, swarm.gbest_positions[0].copy(), float(swarm.gbest_fitness[0]), elapsed))
+    finally:
+        shm.close()
+
+
+def runIslands(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen, n_islands=None, migrationInterval=10, n_migrants=1,
+               size=2, evaluate="schwefel", seed=0, phi1=2.0, phi2=2.0):
+    '''
+    Performs the single minimization objective particle swarm optimization with one independent swarm per process.
+    Every migrationInterval generations each island sends its best n_migrants particles to the next island in a ring, replacing that island's worst particles.
+
+    :param smin: The minimum speed for a particle.
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :param n_pop: Number of particles to have in each island's population
+    :param n_gen: Number of generations to iterate (number of times particles move)
+    :param bestPerGen: Bool for if the best particle should be reset each generation
+    :param n_islands: Number of islands (processes). Defaults to the number of cores.
+    :param migrationInterval: Number of generations between migrations. 0 never migrates.
+    :param n_migrants: Number of particles each island sends at a migration.
+    :param size: The number of dimensions for the particles.
+    :param evaluate: The name of a registered VectorBenchmarks objective, or a picklable function scoring the (n_pop, dim) positions.
+    :param seed: The seed of the run (an int or numpy SeedSequence). Island i draws from the i-th stream spawned from it (see RandomStreams.stream), so an island's numbers don't depend on the number of islands.
+    :param phi1: The maximum weight a particle's best position should have on the updated speed
+    :param phi2: The maximum weight the island's best position should have on the updated speed
+    :return: Returns a dict with the best position/fitness over all islands, each island's logbook, the global convergence logbook and the evaluations per second.
+    '''
+
+    if n_islands is None:
+        n_islands = multiprocessing.cpu_count()
+    n_migrants = min(n_migrants, n_pop)
+    params = dict(smin=smin, smax=smax, pmin=pmin, pmax=pmax, n_pop=n_pop, n_gen=n_gen, bestPerGen=bestPerGen, size=size,
+                  evaluate=evaluate, seed=seed, phi1=phi1, phi2=phi2, migrationInterval=migrationInterval)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n_islands * n_migrants * (size + 1) * 8))
+    results = multiprocessing.Queue()
+    barrier = multiprocessing.Barrier(n_islands)
+    processes = [multiprocessing.Process(target=_runIsland, args=(i, n_islands, shm.name, n_migrants, params, results, barrier))
+                 for i in range(n_islands)]
+    try:
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+
+        # Collects the results, stopping everything if an island dies so the others are not left waiting at the barrier
+        finished = {}
+        while len(finished) < n_islands:
+            try:
+                island, logbook, position, fitness, elapsed = results.get(timeout=1)
+                finished[island] = (logbook, position, fitness)
+            except queue.Empty:
+                if any(process.exitcode not in (None, 0) for process in processes):
+                    barrier.abort()
+                    raise RuntimeError("An island process failed, see its traceback above")
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        shm.close()
+        shm.unlink()
+
+    # The global convergence is the best fitness over all the islands for each generation
+    islandLogbooks = [finished[i][0] for i in range(n_islands)]
+    logbook = tools.Logbook()
+    logbook.header = ["gen", "evals", "min", "best"]
+    for generation in range(n_gen):
+        rows = [book[generation] for book in islandLogbooks]
+        logbook.record(gen=generation, evals=sum(row["evals"] for row in rows), min=min(row["min"] for row in rows),
+                       best=min(row["best"] for row in rows))
+
+    best = min(range(n_islands), key=lambda i: finished[i][2])
+    return {
+        "best_position": finished[best][1],
+        "best_fitness": finished[best][2],
+        "island_logbooks": islandLogbooks,
+        "logbook": logbook,
+        "evals_per_sec": n_islands * n_pop * n_gen / elapsed,
+    }
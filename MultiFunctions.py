@@ -1,31 +1,69 @@
 import operator
+import os
 import random
 import numpy
-import matplotlib.pyplot as plt
 from deap import base
 from deap import benchmarks
 from deap import creator
 from deap import tools
+import Checkpoint
+import EvaluationCache
+import Evaluators
+import Observers
+import Profiling
+import RandomStreams
+import RunLog
+import Topologies
+import SwarmEngine
+import VectorBenchmarks
+import VelocityKernels
 
 # adapted stuff from https://deap.readthedocs.io/en/master/index.html
 
 
+class ParticleMulti(list):
+    '''
+    The particle is a list which are the positions for the particle. The class also has the current speed (separated into each axis), the min/max position/speed, and the best location this particle has found for both objectives.
+    Uses __slots__ instead of a per-particle __dict__, which makes every particle and best position smaller.
+    '''
+
+    __slots__ = ("fitness", "speed", "smin", "smax", "best1", "best2", "pmin", "pmax")
+
+    def __init__(self, positions=()):
+        super().__init__(positions)
+        self.fitness = creator.FitnessMulti()
+        self.speed = []
+        self.smin = self.smax = self.best1 = self.best2 = self.pmin = self.pmax = None
+
+
 def makeCreatorMulti():
     '''
     Makes the needed classes to define how the particles in the population are structured.
     Fitness is multi-objective minimization.
-    The particle is a list which are the positions for the particle. The class also has the current speed (separated into each axis), the min/max position/speed, and the best location this particle has found for both objectives.
+    The particle is the ParticleMulti class, put on the creator as creator.ParticleMulti.
     The limits of position/speed are the same for each dimension in this implementation.
 
     :return: Returns the creator object with the created classes.
     '''
 
     creator.create("FitnessMulti", base.Fitness, weights=(-1.0, -1.0))
-    creator.create("ParticleMulti", list, fitness=creator.FitnessMulti, speed=list, smin=None, smax=None, best1=None, best2=None, pmin=None, pmax=None)
+    creator.ParticleMulti = ParticleMulti
     return creator
 
 
-def generateParticleMulti(size, pmin, pmax, smin, smax):
+def copyBestMulti(target, part):
+    '''
+    Copies a particle's positions and fitnesses into a best position in place, so no new particle is made for each improvement.
+
+    :param target: The best position being overwritten.
+    :param part: The particle whose position is copied.
+    '''
+
+    target[:] = part
+    target.fitness.values = part.fitness.values
+
+
+def generateParticleMulti(size, pmin, pmax, smin, smax, rng=None):
     '''
     This function is used to generate a new, random particle confined to the limits of what the position and speed can be.
     The limits of position/speed are the same for each dimension in this implementation.
@@ -35,19 +73,27 @@ def generateParticleMulti(size, pmin, pmax, smin, smax):
     :param pmax: The maximum position for the particle.
     :param smin: The minimum speed for the particle.
     :param smax: The maximum speed for the particle.
+    :param rng: The run's numpy Generator (see RandomStreams), the positions and speeds are drawn from it in one block. None uses the random module.
     :return: Returns the particle object after it has been made.
     '''
 
-    part = creator.ParticleMulti(random.uniform(pmin, pmax) for _ in range(size))  # Create two positions for x, y coordinates
-    part.speed = [random.uniform(smin, smax) for _ in range(size)] # Create the x, y speeds
+    if rng is None:
+        part = creator.ParticleMulti(random.uniform(pmin, pmax) for _ in range(size))  # Create two positions for x, y coordinates
+        part.speed = [random.uniform(smin, smax) for _ in range(size)] # Create the x, y speeds
+    else:
+        positions, speeds = rng.random((2, size)).tolist()
+        part = creator.ParticleMulti(pmin + (pmax - pmin) * u for u in positions)
+        part.speed = [smin + (smax - smin) * u for u in speeds]
     part.smin = smin
     part.smax = smax
     part.pmin = pmin
     part.pmax = pmax
+    part.best1 = creator.ParticleMulti() # Empty until the first evaluation, then overwritten in place
+    part.best2 = creator.ParticleMulti()
     return part
 
 
-def updateParticleMulti(part, best1, best2, phi1, phi2):
+def updateParticleMulti(part, best1, best2, phi1, phi2, weights=None):
     '''
     Updates the particle's speed and then position with the newly calculated speed.
     The speed changes based on the best position this current particle has found and the best overall particle for both objectives.
@@ -57,12 +103,19 @@ def updateParticleMulti(part, best1, best2, phi1, phi2):
     :param best1: The best particle that has been found overall for the second objective.
     :param phi1: The maximum weight this particle's best position's should have on the updated speed
     :param phi2: The maximum weight the overall best particles's positions should have on the updated speed
+    :param weights: The particle's uniform [0, 1) weights for its best and the best particle's positions of the first objective, then of the second one, drawn for the whole population at once (see RandomStreams.updateWeights). None draws them from the random module.
     '''
 
-    u1 = (random.uniform(0, phi1) for _ in range(len(part))) # Generate a random weight for this particle's best position (for each dimension) based on the first objective.
-    u2 = (random.uniform(0, phi2) for _ in range(len(part))) # Generate a random weight for the overall best particle's position (for each dimension) based on the first objective.
-    u3 = (random.uniform(0, phi1) for _ in range(len(part))) # Generate a random weight for this particle's best position (for each dimension) based on the second objective.
-    u4 = (random.uniform(0, phi2) for _ in range(len(part))) # Generate a random weight for the overall best particle's position (for each dimension) based on the second objective.
+    if weights is None:
+        u1 = (random.uniform(0, phi1) for _ in range(len(part))) # Generate a random weight for this particle's best position (for each dimension) based on the first objective.
+        u2 = (random.uniform(0, phi2) for _ in range(len(part))) # Generate a random weight for the overall best particle's position (for each dimension) based on the first objective.
+        u3 = (random.uniform(0, phi1) for _ in range(len(part))) # Generate a random weight for this particle's best position (for each dimension) based on the second objective.
+        u4 = (random.uniform(0, phi2) for _ in range(len(part))) # Generate a random weight for the overall best particle's position (for each dimension) based on the second objective.
+    else:
+        u1 = (phi1 * w for w in weights[0])
+        u2 = (phi2 * w for w in weights[1])
+        u3 = (phi1 * w for w in weights[2])
+        u4 = (phi2 * w for w in weights[3])
     v_u1 = map(operator.mul, u1, map(operator.sub, part.best1, part)) # The amount of pull to this particle's best positon based on the first objective.
     v_u2 = map(operator.mul, u2, map(operator.sub, best1, part)) # The amount of pull to the best particle's position based on the first objective.
     v_u3 = map(operator.mul, u3, map(operator.sub, part.best2, part)) # The amount of pull to this particle's best positon based on the second objective.
@@ -119,13 +172,12 @@ def graphmulti(pop):
     :param pop: The list of all the particles in the swarm
     :return: Nothing is fully returned as plots are shown instead.
     '''
+    import matplotlib.pyplot as plt # Only needed when plotting is asked for
+
     # The range of the X, Y values are small, just between -5 and 6 for both.
     # The color is based on the error for the function being examined for those X, Y positions (lighter is better for both as it is closer to 0)
-    X = numpy.arange(-5, 6, 1)
-    Y = numpy.arange(-5, 6, 1)
-    X, Y = numpy.meshgrid(X, Y)
-    Z1 = numpy.fromiter(map(himmelblau_arg0, zip(X.flat,Y.flat)), dtype=float, count=X.shape[0]*X.shape[1]).reshape(X.shape)
-    Z2 = numpy.fromiter(map(rastrigin_arg0, zip(X.flat,Y.flat)), dtype=float, count=X.shape[0]*X.shape[1]).reshape(X.shape)
+    X, Y, Z1 = VectorBenchmarks.cachedGrid(VectorBenchmarks.himmelblau, (-5, 6, 1), (-5, 6, 1))
+    X, Y, Z2 = VectorBenchmarks.cachedGrid(VectorBenchmarks.rastrigin, (-5, 6, 1), (-5, 6, 1))
     Z3 = (Z1+Z2)/2 # Just basic avg between the two functions
     
     fig, (ax1, ax2, ax3) = plt.subplots(1, 3)
@@ -159,7 +211,64 @@ def graphmulti(pop):
     plt.show()
 
 
-def makeToolboxMulti(smin, smax, pmin, pmax):
+def populationToArraysMulti(pop, best1, best2):
+    '''
+    Packs the state of the particles and the best particles for both objectives into arrays, for checkpoints.
+
+    :param pop: The list of all the particles in the swarm
+    :param best1: The best particle that has been found overall for the first objective.
+    :param best2: The best particle that has been found overall for the second objective.
+    :return: Returns the dict of arrays.
+    '''
+
+    return {
+        "positions": numpy.array(pop, dtype=float),
+        "speeds": numpy.array([part.speed for part in pop], dtype=float),
+        "best1_positions": numpy.array([part.best1 for part in pop], dtype=float),
+        "best1_fitness": numpy.array([part.best1.fitness.values for part in pop], dtype=float),
+        "best2_positions": numpy.array([part.best2 for part in pop], dtype=float),
+        "best2_fitness": numpy.array([part.best2.fitness.values for part in pop], dtype=float),
+        "gbest1_position": numpy.array(best1, dtype=float),
+        "gbest1_fitness": numpy.array(best1.fitness.values, dtype=float),
+        "gbest2_position": numpy.array(best2, dtype=float),
+        "gbest2_fitness": numpy.array(best2.fitness.values, dtype=float),
+    }
+
+
+def arraysToPopulationMulti(arrays, smin, smax, pmin, pmax):
+    '''
+    Rebuilds the particles and the best particles for both objectives from the arrays of populationToArraysMulti.
+
+    :param arrays: The dict of arrays.
+    :param smin: The minimum speed for a particle. 
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :return: Returns the list of particles and the (best1, best2) tuple.
+    '''
+
+    def rebuild(position, fitness):
+        part = creator.ParticleMulti(position)
+        part.fitness.values = tuple(fitness)
+        return part
+
+    pop = []
+    for i, (position, speed) in enumerate(zip(arrays["positions"].tolist(), arrays["speeds"].tolist())):
+        part = creator.ParticleMulti(position)
+        part.speed = speed
+        part.smin = smin
+        part.smax = smax
+        part.pmin = pmin
+        part.pmax = pmax
+        part.best1 = rebuild(arrays["best1_positions"][i].tolist(), arrays["best1_fitness"][i].tolist())
+        part.best2 = rebuild(arrays["best2_positions"][i].tolist(), arrays["best2_fitness"][i].tolist())
+        pop.append(part)
+    best1 = rebuild(arrays["gbest1_position"].tolist(), arrays["gbest1_fitness"].tolist())
+    best2 = rebuild(arrays["gbest2_position"].tolist(), arrays["gbest2_fitness"].tolist())
+    return pop, (best1, best2)
+
+
+def makeToolboxMulti(smin, smax, pmin, pmax, executor=None, cacheSize=0, cacheQuantum=None, phi1=2.0, phi2=2.0, rng=None, objectives=None, vectorized=True):
     '''
     Makes the toolbox which contains the functions needed to perform the particle swarm optimization.
 
@@ -167,20 +276,56 @@ def makeToolboxMulti(smin, smax, pmin, pmax):
     :param smax: The maximum speed for a particle.
     :param pmin: The minimum position for a particle.
     :param pmax: The maximum position for a particle.
+    :param executor: The concurrent.futures executor the population is evaluated on in chunks (see Evaluators.makeExecutor). None evaluates serially.
+    :param cacheSize: The number of evaluated positions to remember for each function so they are not evaluated again. 0 turns the caches off.
+    :param cacheQuantum: The grid size positions are rounded to for the caches. None only reuses exactly equal positions.
+    :param phi1: The maximum weight a particle's best positions should have on the updated speed
+    :param phi2: The maximum weight the best particles' positions should have on the updated speed
+    :param rng: The run's numpy Generator the particles are made from, None uses the random module.
+    :param objectives: The (objective1, objective2) functions minimized instead of the Himmelblau and Rastrigin functions, or the names of VectorBenchmarks objectives. They are evaluated in chunks on the executor, so for process pools they have to be picklable.
+    :param vectorized: Bool for if the objectives take the whole (n, dim) positions at once (like VectorBenchmarks) instead of one particle at a time (like deap.benchmarks). Names are always vectorized.
     '''
 
     toolbox = base.Toolbox()
-    toolbox.register("particle", generateParticleMulti, size=2, pmin=pmin, pmax=pmax, smin=smin, smax=smax)
+    toolbox.register("particle", generateParticleMulti, size=2, pmin=pmin, pmax=pmax, smin=smin, smax=smax, rng=rng)
     toolbox.register("population", tools.initRepeat, list, toolbox.particle)
-    toolbox.register("update", updateParticleMulti, phi1=2.0, phi2=2.0)
-    toolbox.register("evaluatehimmelblau", benchmarks.himmelblau)
-    toolbox.register("evaluaterastrigin", benchmarks.rastrigin)
+    toolbox.register("update", updateParticleMulti, phi1=phi1, phi2=phi2)
+    if objectives is None:
+        toolbox.register("evaluatehimmelblau", benchmarks.himmelblau)
+        toolbox.register("evaluaterastrigin", benchmarks.rastrigin)
+        toolbox.register("evaluatehimmelblaubatch", Evaluators.ChunkedEvaluator(VectorBenchmarks.himmelblau, executor)) # Scores the whole population in one call
+        toolbox.register("evaluaterastriginbatch", Evaluators.ChunkedEvaluator(VectorBenchmarks.rastrigin, executor))
+    else:
+        # Other objectives keep the names of the functions they replace, first and second
+        if len(objectives) != 2:
+            raise ValueError("The multi-objective runs take 2 objectives, got %d" % len(objectives))
+        evaluates = [Evaluators.ChunkedEvaluator(VectorBenchmarks.getObjective(objective), executor) if isinstance(objective, str)
+                     else Evaluators.ChunkedEvaluator(objective, executor, vectorized) for objective in objectives]
+        toolbox.register("evaluatehimmelblau", evaluates[0].single)
+        toolbox.register("evaluaterastrigin", evaluates[1].single)
+        toolbox.register("evaluatehimmelblaubatch", evaluates[0])
+        toolbox.register("evaluaterastriginbatch", evaluates[1])
+
+    # Optionally each function's evaluations go through its own cache of the positions already evaluated
+    if cacheSize:
+        cache1 = EvaluationCache.CachedEvaluator(toolbox.evaluatehimmelblaubatch, cacheSize, cacheQuantum)
+        cache2 = EvaluationCache.CachedEvaluator(toolbox.evaluaterastriginbatch, cacheSize, cacheQuantum)
+        toolbox.register("evaluatehimmelblau", cache1.single)
+        toolbox.register("evaluaterastrigin", cache2.single)
+        toolbox.register("evaluatehimmelblaubatch", cache1)
+        toolbox.register("evaluaterastriginbatch", cache2)
+        toolbox.register("cachecounters", lambda: {**cache1.counters("1"), **cache2.counters("2")})
+        toolbox.register("cachestate", lambda: {**cache1.state("cache1"), **cache2.state("cache2")})
+        toolbox.register("setcachestate", lambda arrays: (cache1.setState(arrays, "cache1"), cache2.setState(arrays, "cache2")))
     return toolbox
 
 
-def multiObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen):
+def multiObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen, executor=None, cacheSize=0, cacheQuantum=None,
+             checkpointPath=None, checkpointInterval=0, resume=False, instrument=None, recordInterval=1, logPath=None, stop=None, phi1=2.0, phi2=2.0, topology=None, seed=None, kernel=None,
+             objectives=None, vectorized=True):
     '''
-    Performs the multiple minimization objectives particle swarm optimization for the Himmelblau and Rastrigin Functions
+    Performs the multiple minimization objectives particle swarm optimization for the Himmelblau and Rastrigin Functions, graphing the particles before and after and printing the stats of each generation.
+    See runMultiObj for the same run without any plotting or printing.
 
     :param smin: The minimum speed for a particle. 
     :param smax: The maximum speed for a particle.
@@ -189,70 +334,190 @@ def multiObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen):
     :param n_pop: Number of particles to have in the population
     :param n_gen: Number of generations to iterate (number of times particles move)
     :param bestPerGen: Bool for if the best particle should be reset each generation
+    :param executor: The concurrent.futures executor the population is evaluated on in chunks. None evaluates serially.
+    :param cacheSize: The number of evaluated positions to remember for each function so they are not evaluated again. 0 turns the caches off.
+    :param cacheQuantum: The grid size positions are rounded to for the caches. None only reuses exactly equal positions.
+    :param checkpointPath: The file the state of the run is saved to every checkpointInterval generations (see Checkpoint). None turns checkpointing off.
+    :param checkpointInterval: The number of generations between checkpoints.
+    :param resume: Bool for if the run should continue from the checkpoint file if it exists. Gives the same results as a run that was never stopped, the caches and their hits/misses are saved in the checkpoint too.
+    :param instrument: A Profiling.Instrumentation recording the time of each phase, the allocations and garbage collections of each generation as extra logbook columns. None turns it off.
+    :param recordInterval: The stats are only calculated and recorded every recordInterval generations (and for the first and last ones).
+    :param logPath: The CSV file the logbook rows are streamed to, only the last row is kept in memory (see RunLog.StreamingLogbook). None keeps the whole logbook.
+    :param stop: A Termination.StopCriteria to end the run early. Why it stopped is printed at the end. None always runs n_gen generations.
+    :param phi1: The maximum weight a particle's best positions should have on the updated speed
+    :param phi2: The maximum weight the best particles' positions should have on the updated speed
+    :param topology: A Topologies topology or its name ("ring", "vonneumann", "random", "knn"), each particle then follows the best of its neighborhood instead of the best particle. None is the global best topology.
+    :param seed: The seed of the run's own random number stream (an int, numpy SeedSequence or Generator, see RandomStreams), its numbers are drawn one block per generation. None draws from the random module.
+    :param kernel: A VelocityKernels kernel (or its name: "linear", "constriction", "adaptive") the speeds are updated with, all the particles at once. None adds the pulls onto the speeds.
+    :param objectives: The (objective1, objective2) functions minimized instead of the Himmelblau and Rastrigin functions, or the names of VectorBenchmarks objectives. They are evaluated in chunks on the executor, so for process pools they have to be picklable.
+    :param vectorized: Bool for if the objectives take the whole (n, dim) positions at once (like VectorBenchmarks) instead of one particle at a time (like deap.benchmarks). Names are always vectorized.
     :return: Nothing is returned as the results are printed. Could add a way to save the results.
     '''
 
+    runMultiObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen, executor, cacheSize, cacheQuantum,
+                observers=[Observers.PlotObserver(graphmulti), Observers.PrintObserver()],
+                checkpointPath=checkpointPath, checkpointInterval=checkpointInterval, resume=resume, instrument=instrument,
+                recordInterval=recordInterval, logPath=logPath, stop=stop, phi1=phi1, phi2=phi2, topology=topology, seed=seed, kernel=kernel,
+                objectives=objectives, vectorized=vectorized)
+    if stop is not None and stop.reason is not None:
+        print("Stopped after generation %d: %s" % (stop.generation, stop.reason))
+
+
+def runMultiObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen, executor=None, cacheSize=0, cacheQuantum=None, observers=(),
+                checkpointPath=None, checkpointInterval=0, resume=False, instrument=None, recordInterval=1, logPath=None, stop=None, phi1=2.0, phi2=2.0, topology=None, seed=None, kernel=None,
+                objectives=None, vectorized=True):
+    '''
+    Performs the multiple minimization objectives particle swarm optimization for the Himmelblau and Rastrigin Functions (or the given objectives) without plotting or printing anything.
+
+    :param smin: The minimum speed for a particle. 
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :param n_pop: Number of particles to have in the population
+    :param n_gen: Number of generations to iterate (number of times particles move)
+    :param bestPerGen: Bool for if the best particle should be reset each generation
+    :param executor: The concurrent.futures executor the population is evaluated on in chunks. None evaluates serially.
+    :param cacheSize: The number of evaluated positions to remember for each function so they are not evaluated again. 0 turns the caches off.
+    :param cacheQuantum: The grid size positions are rounded to for the caches. None only reuses exactly equal positions.
+    :param observers: The Observers.Observer objects called at the start, after each generation and at the end of the run (for printing, plotting, ...).
+    :param checkpointPath: The file the state of the run is saved to every checkpointInterval generations (see Checkpoint). None turns checkpointing off.
+    :param checkpointInterval: The number of generations between checkpoints.
+    :param resume: Bool for if the run should continue from the checkpoint file if it exists. Gives the same results as a run that was never stopped, the caches and their hits/misses are saved in the checkpoint too.
+    :param instrument: A Profiling.Instrumentation recording the time of each phase, the allocations and garbage collections of each generation as extra logbook columns. None turns it off.
+    :param recordInterval: The stats are only calculated and recorded every recordInterval generations (and for the first and last ones).
+    :param logPath: The CSV file the logbook rows are streamed to, only the last row is kept in memory (see RunLog.StreamingLogbook). None keeps the whole logbook.
+    :param stop: A Termination.StopCriteria checked after each generation, the run ends early when one of its criteria is met and its reason says which. None always runs n_gen generations.
+    :param phi1: The maximum weight a particle's best positions should have on the updated speed
+    :param phi2: The maximum weight the best particles' positions should have on the updated speed
+    :param topology: A Topologies topology or its name ("ring", "vonneumann", "random", "knn"), each particle then follows the best of its neighborhood instead of the best particle. None is the global best topology.
+    :param seed: The seed of the run's own random number stream (an int, numpy SeedSequence or Generator, see RandomStreams), its numbers are drawn one block per generation. None draws from the random module.
+    :param kernel: A VelocityKernels kernel (or its name: "linear", "constriction", "adaptive") the speeds are updated with, all the particles at once. None adds the pulls onto the speeds.
+    :param objectives: The (objective1, objective2) functions minimized instead of the Himmelblau and Rastrigin functions, or the names of VectorBenchmarks objectives. They are evaluated in chunks on the executor, so for process pools they have to be picklable.
+    :param vectorized: Bool for if the objectives take the whole (n, dim) positions at once (like VectorBenchmarks) instead of one particle at a time (like deap.benchmarks). Names are always vectorized.
+    :return: Returns the final population, the best particles found for both functions as a (best1, best2) tuple and the logbook of the run.
+    '''
+
     # Sets up the needed classes/functions to perform the algorithm
+    rng = RandomStreams.makeRng(seed)
+    topology = Topologies.getTopology(topology)
     creator = makeCreatorMulti()
-    toolbox = makeToolboxMulti(smin, smax, pmin, pmax)
+    toolbox = makeToolboxMulti(smin, smax, pmin, pmax, executor, cacheSize, cacheQuantum, phi1, phi2, rng, objectives, vectorized)
     
     
-    # Sets up the stats to track for both functions
-    stats1 = tools.Statistics(lambda ind: ind.fitness.values[0]) # Logbook will print out stats for the fitness for both functions
-    stats1.register("avg1", numpy.mean)
-    stats1.register("std1", numpy.std)
-    stats1.register("min1", numpy.min)
-    stats1.register("max1", numpy.max)
-    stats2 = tools.Statistics(lambda ind: ind.fitness.values[1])
-    stats2.register("avg2", numpy.mean)
-    stats2.register("std2", numpy.std)
-    stats2.register("min2", numpy.min)
-    stats2.register("max2", numpy.max)
-    logbook = tools.Logbook()
-    logbook.header = ["gen", "evals"] + stats1.fields + stats2.fields
-
-    # Makes the initial particles and grapgs where they start
-    pop = toolbox.population(n=n_pop)
-    graphmulti(pop)
+    # Sets up the logbook with the stats to track for both functions
+    logbook = RunLog.makeLogbook(["gen", "evals"] + RunLog.statFields(["1", "2"]), logPath)
+    cached = hasattr(toolbox, "cachecounters")
+    if cached:
+        logbook.header += ["hits1", "misses1", "hits2", "misses2"] # Total cache hits/misses so far for each function
+    instrument = instrument or Profiling.DISABLED
+    logbook.header += instrument.fields
+
+    # Makes the initial particles, or picks up where the checkpoint left off
+    startGen = 0
+    if resume and checkpointPath is not None and os.path.exists(checkpointPath):
+        arrays, generation, logbook = Checkpoint.loadCheckpoint(checkpointPath, rng)
+        pop, (best1, best2) = arraysToPopulationMulti(arrays, smin, smax, pmin, pmax)
+        if topology is not None:
+            topology.setState(arrays)
+        if cached:
+            toolbox.setcachestate(arrays)
+        startGen = generation + 1
+    else:
+        pop = toolbox.population(n=n_pop)
+        best1 = creator.ParticleMulti() # The fitnesses stay invalid until the first evaluation
+        best2 = creator.ParticleMulti()
+    if stop is not None:
+        stop.start()
+    if kernel is not None:
+        kernel = VelocityKernels.getKernel(kernel)
+        kernel.start(phi1, phi2, n_gen)
+    Observers.notify(observers, "start", pop)
     
-    best1 = None
-    best2 = None
-    for generation in range(n_gen):
-        # If enabled, only the best current particle will have an influence on the others. Not the overall best one found 
-        if bestPerGen:
-            best1 = None
-            best2 = None
-        
-        for part in pop:
-            part.fitness.values = toolbox.evaluatehimmelblau(part)[0], toolbox.evaluaterastrigin(part)[0]
-            
-            # Keeping track of the best position based on the first function for each unique particle
-            if not part.best1 or part.best1.fitness.values[0] > part.fitness.values[0]:
-                part.best1 = creator.ParticleMulti(part)
-                part.best1.fitness.values = part.fitness.values
+    instrument.startRun()
+    try:
+        for generation in range(startGen, n_gen):
+            instrument.startGeneration()
+            previous = [b.fitness.values if b.fitness.valid else None for b in (best1, best2)] # Kept before the reset, for the topologies to know if the bests improved
+            # If enabled, only the best current particle will have an influence on the others. Not the overall best one found 
+            if bestPerGen:
+                del best1.fitness.values
+                del best2.fitness.values
             
-            # Keeping track of the best position based on the second function for each unique particle
-            if not part.best2 or part.best2.fitness.values[1] > part.fitness.values[1]:
-                part.best2 = creator.ParticleMulti(part)
-                part.best2.fitness.values = part.fitness.values
+            with instrument.phase("evaluate"):
+                positions = numpy.array(pop)
+                fitnessArray = numpy.column_stack((toolbox.evaluatehimmelblaubatch(positions), toolbox.evaluaterastriginbatch(positions)))
+                fitnesses = list(map(tuple, fitnessArray))
+            with instrument.phase("bests"):
+                success = 0 # The number of particles whose best position improved for either function, for the velocity kernel
+                for part, fit in zip(pop, fitnesses):
+                    part.fitness.values = fit
+                    improved = False
+                    
+                    # Keeping track of the best position based on the first function for each unique particle
+                    if not part.best1.fitness.valid or part.best1.fitness.values[0] > part.fitness.values[0]:
+                        copyBestMulti(part.best1, part)
+                        improved = True
+                    
+                    # Keeping track of the best position based on the second function for each unique particle
+                    if not part.best2.fitness.valid or part.best2.fitness.values[1] > part.fitness.values[1]:
+                        copyBestMulti(part.best2, part)
+                        improved = True
+                    success += improved
+                    
+                    # Keeping track of the best particle found for the first function
+                    if not best1.fitness.valid or best1.fitness.values[0] > part.fitness.values[0]:
+                        copyBestMulti(best1, part)
+                    
+                    # Keeping track of the best particle found for the first function
+                    if not best2.fitness.valid or best2.fitness.values[1] > part.fitness.values[1]:
+                        copyBestMulti(best2, part)
+
+                # With a topology each particle follows the best of its own neighborhood for each function
+                if topology is not None:
+                    improved = any(old is None or b.fitness.values[k] < old[k] for k, (b, old) in enumerate(zip((best1, best2), previous)))
+                    leaders1, leaders2 = topology.leaders(numpy.array(pop), numpy.array([[part.best1 for part in pop], [part.best2 for part in pop]]),
+                                                          numpy.array([[part.best1.fitness.values[0] for part in pop], [part.best2.fitness.values[1] for part in pop]]),
+                                                          improved, rng).tolist()
             
-            # Keeping track of the best particle found for the first function
-            if not best1 or best1.fitness.values[0] > part.fitness.values[0]:
-                best1 = creator.ParticleMulti(part)
-                best1.fitness.values = part.fitness.values
+            # Updates the positions (and speeds) of each particle
+            with instrument.phase("update"):
+                if kernel is not None:
+                    # The kernel updates every particle at once on arrays
+                    kernel.step(generation, success / len(pop))
+                    SwarmEngine.movePopulation(pop, [[part.best1 for part in pop], [part.best2 for part in pop]],
+                                               [best1, best2] if topology is None else [leaders1, leaders2],
+                                               phi1, phi2, smin, smax, pmin, pmax, rng, kernel)
+                else:
+                    weights = RandomStreams.updateWeights(rng, len(pop), len(pop[0]), 2) if rng is not None else [None] * len(pop)
+                    if topology is None:
+                        for part, w in zip(pop, weights):
+                            toolbox.update(part, best1, best2, weights=w)
+                    else:
+                        for part, leader1, leader2, w in zip(pop, leaders1, leaders2, weights):
+                            toolbox.update(part, leader1, leader2, weights=w)
             
-            # Keeping track of the best particle found for the first function
-            if not best2 or best2.fitness.values[1] > part.fitness.values[1]:
-                best2 = creator.ParticleMulti(part)
-                best2.fitness.values = part.fitness.values
-        
-        # Updates the positions (and speeds) of each particle
-        for part in pop:
-            toolbox.update(part, best1, best2)
-        
-        # Records the stats about the fitnesses for the population each generation
-        logbook.record(gen=generation, evals=len(pop), **stats1.compile(pop), **stats2.compile(pop))
-        print(logbook.stream)
+            # Checks if the run should stop early. The arrays of the moved particles are only made for the criteria that need them
+            reason = None
+            if stop is not None:
+                current = numpy.array(pop) if stop.needsPositions else None
+                speeds = numpy.array([part.speed for part in pop]) if stop.needsSpeeds else None
+                reason = stop.check(generation, (generation + 1) * len(pop), (best1.fitness.values[0], best2.fitness.values[1]), current, speeds)
+
+            # Records the stats about the fitnesses for the population each generation (or every recordInterval generations), both functions in one go
+            if RunLog.shouldRecord(recordInterval, generation, n_gen) or reason:
+                with instrument.phase("stats"):
+                    record = RunLog.fitnessStats(fitnessArray)
+                logbook.record(gen=generation, evals=len(pop), **record, **(toolbox.cachecounters() if cached else {}), **instrument.columns())
+            Observers.notify(observers, "generation", generation, pop, (best1, best2), logbook)
+            # A stopped run is at its last generation, which always gets a checkpoint
+            if Checkpoint.shouldCheckpoint(checkpointPath, checkpointInterval, generation, generation + 1 if reason else n_gen):
+                Checkpoint.saveCheckpoint(checkpointPath, {**populationToArraysMulti(pop, best1, best2), **(topology.state() if topology is not None else {}),
+                                                           **(toolbox.cachestate() if cached else {})}, generation, logbook, rng)
+            if reason:
+                break
+    finally:
+        instrument.endRun()
+        RunLog.closeLogbook(logbook)
     
-    # Re-graph the particles after they have moved around
-    graphmulti(pop)
+    Observers.notify(observers, "end", pop, (best1, best2), logbook)
+    return pop, (best1, best2), logbook
@@ -0,0 +1,78 @@
+# Observers are the opt-in side effects of a run (printing, plotting, ...). The run functions are headless and only call these hooks.
+# The population passed to the hooks is the list of particles for the DEAP runs and the (n_pop, dim) positions array for the SwarmEngine runs.
+
+
+class Observer:
+    '''
+    Base class of the run observers. Every hook does nothing, so an observer only overrides the ones it needs.
+    '''
+
+    def start(self, pop):
+        '''
+        Called once with the initial population, before the first generation.
+
+        :param pop: The population.
+        '''
+
+    def generation(self, generation, pop, best, logbook):
+        '''
+        Called at the end of every generation, after its stats are recorded.
+
+        :param generation: The generation number.
+        :param pop: The population.
+        :param best: The best particle found (the best particles for each objective in multi-objective runs).
+        :param logbook: The logbook of the run so far.
+        '''
+
+    def end(self, pop, best, logbook):
+        '''
+        Called once after the last generation.
+
+        :param pop: The final population.
+        :param best: The best particle found (the best particles for each objective in multi-objective runs).
+        :param logbook: The logbook of the whole run.
+        '''
+
+
+class PrintObserver(Observer):
+    '''
+    Prints the logbook line of each generation, like the original singleObj/multiObj.
+    Generations that were not recorded (see the recordInterval of the runs) print nothing.
+    '''
+
+    def generation(self, generation, pop, best, logbook):
+        text = logbook.stream
+        if text:
+            print(text)
+
+
+class PlotObserver(Observer):
+    '''
+    Graphs the population at the start and the end of the run with a graph function such as SingleFunctions.graphsingle.
+    '''
+
+    def __init__(self, graph):
+        '''
+        :param graph: Function taking the population and plotting it.
+        '''
+
+        self.graph = graph
+
+    def start(self, pop):
+        self.graph(pop)
+
+    def end(self, pop, best, logbook):
+        self.graph(pop)
+
+
+def notify(observers, hook, *args):
+    '''
+    Calls one hook of every observer.
+
+    :param observers: The observers of the run.
+    :param hook: The name of the hook ("start", "generation" or "end").
+    :param args: The arguments passed to the hook.
+    '''
+
+    for observer in observers:
+        getattr(observer, hook)(*args)
@@ -0,0 +1,268 @@
+import numpy
+from deap import tools
+import Observers
+import RandomStreams
+import RunLog
+import SwarmEngine
+import VectorBenchmarks
+import VelocityKernels
+
+# Multi-objective particle swarm optimization (MOPSO) with an external archive of the non-dominated positions found.
+# Instead of one best particle per objective like multiObj, every particle is pulled towards a leader picked from the archive, so the whole trade-off set is kept and any number of objectives works.
+
+
+BLOCK = 1 << 22 # Most pairs of rows compared at once
+
+
+def weaklyDominated(fitness, by):
+    '''
+    :param fitness: The (n, n_obj) fitness array.
+    :param by: The (m, n_obj) fitness array the rows are compared with.
+    :return: Returns the (n,) bool array of the rows of fitness that a row of by is no worse than on every objective (minimization). The rows are compared in blocks of at most BLOCK pairs.
+    '''
+
+    result = numpy.zeros(len(fitness), dtype=bool)
+    if len(by) == 0:
+        return result
+    step = max(1, BLOCK // len(by))
+    for start in range(0, len(fitness), step):
+        rows = fitness[start:start + step]
+        covered = by[:, 0] <= rows[:, 0, numpy.newaxis]
+        for k in range(1, fitness.shape[1]):
+            covered &= by[:, k] <= rows[:, k, numpy.newaxis]
+        result[start:start + step] = covered.any(axis=1)
+    return result
+
+
+def nonDominated(fitness):
+    '''
+    Finds the non-dominated rows of a fitness array (minimization). Of equal rows only the first one is kept.
+    The rows are sorted first, so a row can only be dominated by the rows before it. For two objectives a running minimum of the second objective finds the front in one pass.
+    For more objectives the sorted rows go through in blocks: each block is compared with the front found so far, then the rows left are compared with the rows before them in the block.
+    The rows before a row are never worse on the first objective, so only the other objectives are compared.
+
+    :param fitness: The (n, n_obj) fitness array.
+    :return: Returns the sorted indexes of the non-dominated rows.
+    '''
+
+    n, n_obj = fitness.shape
+    if n == 0:
+        return numpy.zeros(0, dtype=int)
+    order = numpy.lexsort(fitness.T[::-1]) # Sorted by the first objective, then the second, ...
+    ranked = fitness[order]
+
+    if n_obj == 1:
+        keep = order[:1]
+    elif n_obj == 2:
+        # Sorted by the first objective, a row is non-dominated only if its second objective beats every row before it
+        previous = numpy.minimum.accumulate(ranked[:, 1])
+        kept = numpy.ones(n, dtype=bool)
+        kept[1:] = ranked[1:, 1] < previous[:-1]
+        keep = order[kept]
+    else:
+        kept = numpy.zeros(n, dtype=bool)
+        rest = ranked[:, 1:]
+        front = rest[:0]
+        step = max(1, int(BLOCK ** 0.5))
+        for start in range(0, n, step):
+            block = rest[start:start + step]
+            left = numpy.flatnonzero(~weaklyDominated(block, front))
+            # Then within the block: a row is dropped when a row before it is no worse on every objective.
+            # Comparing with the dropped rows too gives the same result, whatever dropped them is also before the row and no worse than it
+            rows = block[left]
+            covered = numpy.ones((len(rows), len(rows)), dtype=bool)
+            for k in range(rows.shape[1]):
+                covered &= rows[:, k, numpy.newaxis] <= rows[:, k]
+            left = left[~numpy.triu(covered, 1).any(axis=0)]
+            kept[start + left] = True
+            front = numpy.concatenate((front, block[left]))
+        keep = order[kept]
+    return numpy.sort(keep)
+
+
+def crowdingDistance(fitness):
+    '''
+    Calculates the NSGA-II crowding distance of each row of a front. The ends of the front on each objective get an infinite distance.
+
+    :param fitness: The (n, n_obj) fitness of the front.
+    :return: Returns the (n,) crowding distances. Larger means less crowded.
+    '''
+
+    n, n_obj = fitness.shape
+    distance = numpy.zeros(n)
+    if n <= 2:
+        distance[:] = numpy.inf
+        return distance
+    for k in range(n_obj):
+        order = numpy.argsort(fitness[:, k], kind="stable")
+        values = fitness[order, k]
+        span = values[-1] - values[0]
+        distance[order[0]] = distance[order[-1]] = numpy.inf
+        if span > 0:
+            distance[order[1:-1]] += (values[2:] - values[:-2]) / span
+    return distance
+
+
+class ParetoArchive:
+    '''
+    Bounded archive of the non-dominated positions found during a run.
+    When it grows past maxsize the most crowded positions are dropped, so memory and the cost of each insertion stay flat over long runs.
+    '''
+
+    def __init__(self, maxsize, dim, n_obj):
+        '''
+        :param maxsize: The maximum number of positions kept in the archive.
+        :param dim: The number of dimensions of the positions.
+        :param n_obj: The number of objectives.
+        '''
+
+        if maxsize < 1:
+            raise ValueError("The archive needs room for at least one position, got maxsize=%r" % maxsize)
+        self.maxsize = maxsize
+        self.positions = numpy.empty((0, dim))
+        self.fitness = numpy.empty((0, n_obj))
+        self.crowding = numpy.empty(0)
+
+    def __len__(self):
+        return len(self.fitness)
+
+    def insert(self, positions, fitness):
+        '''
+        Adds the non-dominated ones of a batch of positions to the archive and drops the archived positions they dominate.
+
+        :param positions: The (n, dim) positions.
+        :param fitness: The (n, n_obj) fitness of the positions.
+        '''
+
+        # The positions an archived one is no worse than are dropped with one comparison against the archive, before looking for the front
+        new = ~weaklyDominated(fitness, self.fitness)
+        allFitness = numpy.concatenate((self.fitness, fitness[new]))
+        allPositions = numpy.concatenate((self.positions, positions[new]))
+        keep = nonDominated(allFitness)
+        self.positions = allPositions[keep]
+        self.fitness = allFitness[keep]
+        self.crowding = crowdingDistance(self.fitness)
+
+        # Too many positions, keeps the least crowded ones
+        if len(self.fitness) > self.maxsize:
+            keep = numpy.sort(numpy.argsort(-self.crowding, kind="stable")[:self.maxsize])
+            self.positions = self.positions[keep]
+            self.fitness = self.fitness[keep]
+            self.crowding = crowdingDistance(self.fitness)
+
+    def selectLeaders(self, n, rng=None):
+        '''
+        Picks a leader from the archive for each particle by binary tournaments on the crowding distance, favouring the sparse parts of the front.
+
+        :param n: The number of leaders to pick.
+        :param rng: The run's numpy Generator (see RandomStreams). None uses the random module.
+        :return: Returns the (n, dim) positions of the leaders.
+        '''
+
+        picks = numpy.minimum((SwarmEngine.uniformBlock((n, 2), rng) * len(self)).astype(int), len(self) - 1)
+        first, second = picks[:, 0], picks[:, 1]
+        winners = numpy.where(self.crowding[first] >= self.crowding[second], first, second)
+        return self.positions[winners]
+
+
+def dominates(a, b):
+    '''
+    :param a: The (n, n_obj) fitness of the first particles.
+    :param b: The (n, n_obj) fitness of the second particles.
+    :return: Returns the (n,) bool array of whether each row of a dominates the same row of b (minimization).
+    '''
+
+    return numpy.all(a <= b, axis=1) & numpy.any(a < b, axis=1)
+
+
+def updateParetoBests(swarm, fitness, bestFitness, rng=None):
+    '''
+    Updates each particle's best position: replaced when the new position dominates it, kept when it dominates the new position, and a coin flip when neither does.
+
+    :param swarm: The swarm, its best_positions[0] are the particles' best positions.
+    :param fitness: The (n_pop, n_obj) fitness of the current positions.
+    :param bestFitness: The (n_pop, n_obj) fitness of the best positions, updated in place.
+    :param rng: The run's numpy Generator the coin flips are drawn from. None uses the random module.
+    :return: Returns the (n_pop,) bool array of the particles whose best position was replaced.
+    '''
+
+    better = dominates(fitness, bestFitness)
+    neither = ~better & ~dominates(bestFitness, fitness)
+    replace = better | (neither & (SwarmEngine.uniformBlock((len(fitness),), rng) < 0.5))
+    swarm.best_positions[0][replace] = swarm.positions[replace]
+    bestFitness[replace] = fitness[replace]
+    return replace
+
+
+def runParetoSwarm(swarm, evaluate, n_gen, archiveSize, phi1=2.0, phi2=2.0, observers=(), rng=None, kernel=None):
+    '''
+    Runs the multi-objective particle swarm optimization loop on an existing swarm.
+
+    :param swarm: The swarm being optimized. Its gbest fields are left as they are, the leaders come from the archive.
+    :param evaluate: Function taking the (n_pop, dim) positions and returning the (n_pop, n_obj) fitness.
+    :param n_gen: Number of generations to iterate (number of times particles move)
+    :param archiveSize: The maximum number of non-dominated positions kept in the archive.
+    :param phi1: The maximum weight a particle's best position should have on the updated speed
+    :param phi2: The maximum weight the particle's leader should have on the updated speed
+    :param observers: The Observers.Observer objects called with the positions array and the archived positions.
+    :param rng: The run's numpy Generator (see RandomStreams). None uses the random module.
+    :param kernel: A VelocityKernels kernel (or its name) the speeds are updated with. The adaptive inertia counts the particles whose best position was replaced as successes. None adds the pulls onto the speeds.
+    :return: Returns the archive and the logbook with the stats for each generation.
+    '''
+
+    archive = None
+    bestFitness = None
+    logbook = tools.Logbook()
+
+    if kernel is not None:
+        kernel = VelocityKernels.getKernel(kernel)
+        kernel.start(phi1, phi2, n_gen)
+    Observers.notify(observers, "start", swarm.positions)
+    for generation in range(n_gen):
+        fitness = numpy.asarray(evaluate(swarm.positions), dtype=float)
+        if archive is None:
+            archive = ParetoArchive(archiveSize, swarm.positions.shape[1], fitness.shape[1])
+            bestFitness = numpy.full(fitness.shape, numpy.inf)
+            suffixes = [str(k + 1) for k in range(fitness.shape[1])]
+            logbook.header = ["gen", "evals", "front"] + RunLog.statFields(suffixes)
+
+        success = updateParetoBests(swarm, fitness, bestFitness, rng)
+        archive.insert(swarm.positions, fitness)
+
+        # Every particle gets its own leader from the archive
+        leaders = archive.selectLeaders(len(swarm), rng)[numpy.newaxis]
+        if kernel is not None:
+            kernel.step(generation, success.mean())
+        SwarmEngine.updateSwarm(swarm, phi1, phi2, leaders, rng, kernel)
+
+        logbook.record(gen=generation, evals=len(swarm), front=len(archive), **RunLog.fitnessStats(fitness, suffixes))
+        Observers.notify(observers, "generation", generation, swarm.positions, archive.positions, logbook)
+    Observers.notify(observers, "end", swarm.positions, archive.positions if archive is not None else None, logbook)
+    return archive, logbook
+
+
+def multiObjPareto(smin, smax, pmin, pmax, n_pop, n_gen, archiveSize=100, objectives=("himmelblau", "rastrigin"), size=2, observers=(), seed=None, kernel=None, phi1=2.0, phi2=2.0):
+    '''
+    Performs the multiple minimization objectives particle swarm optimization with a Pareto archive, for the Himmelblau and Rastrigin functions by default.
+
+    :param smin: The minimum speed for a particle.
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :param n_pop: Number of particles to have in the population
+    :param n_gen: Number of generations to iterate (number of times particles move)
+    :param archiveSize: The maximum number of non-dominated positions kept in the archive.
+    :param objectives: The vectorized objectives (or their VectorBenchmarks names), any number of them.
+    :param size: The number of dimensions for the particles.
+    :param observers: The Observers.Observer objects called during the run, for example Observers.PlotObserver(MultiFunctions.graphmulti).
+    :param seed: The seed of the run's own random number stream (see RandomStreams). None draws from the random module.
+    :param kernel: A VelocityKernels kernel (or its name: "linear", "constriction", "adaptive") the speeds are updated with. None adds the pulls onto the speeds.
+    :param phi1: The maximum weight a particle's best position should have on the updated speed
+    :param phi2: The maximum weight the particle's leader should have on the updated speed
+    :return: Returns the archive (its positions and fitness are the Pareto front found), the final swarm and the logbook of the run.
+    '''
+
+    rng = RandomStreams.makeRng(seed)
+    swarm = SwarmEngine.generateSwarm(n_pop, size, pmin, pmax, smin, smax, rng=rng)
+    archive, logbook = runParetoSwarm(swarm, VectorBenchmarks.stackObjectives(*objectives), n_gen, archiveSize, phi1, phi2, observers=observers, rng=rng, kernel=kernel)
+    return archive, swarm, logbook
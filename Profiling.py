@@ -0,0 +1,150 @@
+import collections
+import contextlib
+import gc
+import sys
+import threading
+import time
+
+# Instrumentation of the hot path of the runs: how long each phase of a generation takes, how many memory blocks and garbage collections it caused,
+# and optionally a sampling profiler of where the time goes. The numbers are added as extra columns of the logbook, so observers see them with the stats.
+# Runs use DISABLED when no instrumentation is asked for, which only costs a few no-op calls per generation.
+
+PHASES = ("evaluate", "bests", "update", "stats")
+
+
+class Instrumentation:
+    '''
+    Records per-phase timers, allocation and garbage collection counts for each generation of a run.
+    '''
+
+    enabled = True
+
+    def __init__(self, allocations=True, sampleInterval=None):
+        '''
+        :param allocations: Bool for if the net number of allocated memory blocks and the garbage collections of each generation are recorded.
+        :param sampleInterval: Seconds between the samples of the sampling profiler. None turns the profiler off.
+        '''
+
+        self.allocations = allocations
+        self.sampleInterval = sampleInterval
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.samples = collections.Counter()
+        self._blocks = 0
+        self._collections = 0
+        self._sampler = None
+        self._stop = threading.Event()
+
+    @property
+    def fields(self):
+        '''
+        :return: Returns the names of the logbook columns this adds.
+        '''
+
+        return ["t_" + name for name in PHASES] + (["allocs", "gcs"] if self.allocations else [])
+
+    def startGeneration(self):
+        '''
+        Resets the timers and counters at the start of a generation.
+        '''
+
+        for name in self.times:
+            self.times[name] = 0.0
+        if self.allocations:
+            self._blocks = sys.getallocatedblocks()
+            self._collections = sum(stat["collections"] for stat in gc.get_stats())
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''
+        Times the code in the with block as one phase of the generation.
+
+        :param name: The name of the phase, one of PHASES.
+        '''
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] += time.perf_counter() - start
+
+    def columns(self):
+        '''
+        :return: Returns the dict of this generation's numbers, to be recorded in the logbook.
+        '''
+
+        columns = {"t_" + name: seconds for name, seconds in self.times.items()}
+        if self.allocations:
+            columns["allocs"] = sys.getallocatedblocks() - self._blocks
+            columns["gcs"] = sum(stat["collections"] for stat in gc.get_stats()) - self._collections
+        return columns
+
+    def startRun(self):
+        '''
+        Starts the sampling profiler, if it is turned on, on the thread doing the run.
+        '''
+
+        if self.sampleInterval is None or self._sampler is not None:
+            return
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+        self._sampler.start()
+
+    def endRun(self):
+        '''
+        Stops the sampling profiler.
+        '''
+
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample(self, thread):
+        '''
+        Runs on the profiler thread, counting the function the run's thread is in every sampleInterval seconds.
+
+        :param thread: The identifier of the thread doing the run.
+        '''
+
+        while not self._stop.wait(self.sampleInterval):
+            frame = sys._current_frames().get(thread)
+            if frame is not None:
+                code = frame.f_code
+                self.samples["%s:%d(%s)" % (code.co_filename, code.co_firstlineno, code.co_name)] += 1
+
+    def topSamples(self, n=10):
+        '''
+        :param n: The number of functions to return.
+        :return: Returns the (function, fraction of the samples) pairs of the functions the run spent the most time in.
+        '''
+
+        total = sum(self.samples.values()) or 1
+        return [(name, count / total) for name, count in self.samples.most_common(n)]
+
+
+class _DisabledInstrumentation:
+    '''
+    Stand-in used when a run is not instrumented. Every hook does nothing.
+    '''
+
+    enabled = False
+    fields = []
+    _phase = contextlib.nullcontext()
+
+    def startGeneration(self):
+        pass
+
+    def phase(self, name):
+        return self._phase
+
+    def columns(self):
+        return {}
+
+    def startRun(self):
+        pass
+
+    def endRun(self):
+        pass
+
+
+DISABLED = _DisabledInstrumentation()
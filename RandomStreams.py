@@ -0,0 +1,59 @@
+import numpy
+
+# Random number streams for reproducible runs.
+# By default the runs draw from the global random module one number at a time, in the order that gives the DEAP particles and the SwarmEngine arrays the same results under random.seed.
+# A run given a seed instead gets its own numpy Generator, made from a SeedSequence, and draws all the numbers of a generation in one block.
+# The streams spawned from a SeedSequence are independent, so each island (or worker) of a run gets its own stream, and island i always gets the same one however many islands there are.
+# The evaluations never draw random numbers, so how they are split over workers doesn't change the results either: one seed gives bit-for-bit the same run.
+# The Generator uses one 64-bit number per float, so one (n_pop, ...) block gives the same numbers as n_pop smaller blocks drawn one after the other.
+
+
+def makeRng(seed):
+    '''
+    :param seed: An int, a numpy SeedSequence, a numpy Generator (used as it is) or None.
+    :return: Returns the run's Generator, None if seed is None (the run then draws from the random module).
+    '''
+
+    if seed is None or isinstance(seed, numpy.random.Generator):
+        return seed
+    if not isinstance(seed, numpy.random.SeedSequence):
+        seed = numpy.random.SeedSequence(seed)
+    return numpy.random.Generator(numpy.random.PCG64(seed))
+
+
+def stream(seed, index):
+    '''
+    :param seed: The seed of the run, an int or a numpy SeedSequence.
+    :param index: The index of the island or worker.
+    :return: Returns the Generator of that island or worker. It is the same as spawnStreams(seed, n)[index] for any n above index.
+    '''
+
+    if not isinstance(seed, numpy.random.SeedSequence):
+        seed = numpy.random.SeedSequence(seed)
+    return makeRng(numpy.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (index,), pool_size=seed.pool_size))
+
+
+def spawnStreams(seed, n):
+    '''
+    :param seed: The seed of the run, an int or a numpy SeedSequence.
+    :param n: The number of streams.
+    :return: Returns the list of n independent Generators, one for each island or worker.
+    '''
+
+    return [stream(seed, index) for index in range(n)]
+
+
+def updateWeights(rng, n_pop, size, n_obj):
+    '''
+    Draws the uniform [0, 1) weights of one generation's update for every particle of a DEAP population at once.
+    The block is the same one SwarmEngine.updateSwarm draws, so both give the same results from the same seed.
+
+    :param rng: The run's Generator.
+    :param n_pop: The number of particles.
+    :param size: The number of dimensions of the particles.
+    :param n_obj: The number of objectives the particles are pulled towards the bests of.
+    :return: Returns a list with, for each particle, the 2 * n_obj lists of weights (one per dimension): the particle's best then the swarm's best, for each objective.
+    '''
+
+    block = rng.random((n_pop, size, n_obj, 2))
+    return block.transpose(0, 2, 3, 1).reshape(n_pop, 2 * n_obj, size).tolist()
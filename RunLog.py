@@ -0,0 +1,167 @@
+import csv
+import os
+import numpy
+from deap import tools
+
+# Recording the stats of the runs. The stats are calculated straight from the fitness array of the population instead of with tools.Statistics,
+# which calls a key function on every particle and builds lists of the values before numpy gets them.
+# For very long runs the logbook can stream its rows to a CSV file and only keep the last ones in memory.
+
+STATS = ("avg", "std", "min", "max")
+
+
+def statFields(suffixes):
+    '''
+    :param suffixes: The suffix put after each stat name for each objective.
+    :return: Returns the logbook column names of the stats.
+    '''
+
+    return [stat + suffix for suffix in suffixes for stat in STATS]
+
+
+def fitnessStats(fitness, suffixes=None):
+    '''
+    Calculates the avg/std/min/max of each objective of a fitness array.
+    The array is laid out one objective per row first, so each stat is one reduction over contiguous memory for all the objectives at once.
+    The values are the same as numpy.mean/std/min/max of each objective.
+
+    :param fitness: The (n_pop,) or (n_pop, n_obj) fitness array.
+    :param suffixes: The suffix put after each stat name for each objective, "" for a single objective and "1", "2", ... for more if not given.
+    :return: Returns the dict of stats.
+    '''
+
+    fitness = numpy.asarray(fitness, dtype=float)
+    if fitness.ndim == 1:
+        fitness = fitness[:, numpy.newaxis]
+    if suffixes is None:
+        suffixes = [""] if fitness.shape[1] == 1 else [str(k + 1) for k in range(fitness.shape[1])]
+
+    columns = numpy.ascontiguousarray(fitness.T)
+    n = columns.shape[1]
+    avg = columns.sum(axis=1) / n
+    deviation = columns - avg[:, numpy.newaxis]
+    numpy.multiply(deviation, deviation, out=deviation)
+    std = numpy.sqrt(deviation.sum(axis=1) / n)
+    low = columns.min(axis=1)
+    high = columns.max(axis=1)
+
+    stats = {}
+    for k, suffix in enumerate(suffixes):
+        stats["avg" + suffix] = avg[k]
+        stats["std" + suffix] = std[k]
+        stats["min" + suffix] = low[k]
+        stats["max" + suffix] = high[k]
+    return stats
+
+
+def shouldRecord(recordInterval, generation, n_gen):
+    '''
+    :param recordInterval: The number of generations between the recorded ones.
+    :param generation: The current generation.
+    :param n_gen: The total number of generations of the run.
+    :return: Returns True if the stats of this generation should be recorded. The first and last generations are always recorded.
+    '''
+
+    return recordInterval <= 1 or generation % recordInterval == 0 or generation + 1 == n_gen
+
+
+class StreamingLogbook(tools.Logbook):
+    '''
+    Logbook that writes each record to a CSV file as soon as it is recorded and only keeps the last few records in memory.
+    It can be pickled into a checkpoint. When it is unpickled the rows written after the checkpoint are cut from the file before new ones are added.
+    '''
+
+    def __init__(self, path, keep=1):
+        '''
+        :param path: The CSV file the records are written to. It is overwritten.
+        :param keep: The number of the latest records kept in memory.
+        '''
+
+        super().__init__()
+        self.path = path
+        self.keep = max(keep, 1)
+        self._file = None
+        self._writer = None
+        self._offset = None # The size of the file when the logbook was pickled
+
+    def record(self, **infos):
+        super().record(**infos)
+        if self._writer is None:
+            self._open(list(self.header) if self.header else list(self[-1]))
+        self._writer.writerow(self[-1])
+
+        # Only the latest records stay in memory. Logbook.pop/__delitem__ can't be used on a subclass
+        excess = len(self) - self.keep
+        if excess > 0:
+            list.__delitem__(self, slice(0, excess))
+            self.buffindex = max(self.buffindex - excess, 0)
+
+    def _open(self, fields):
+        if self._offset is None:
+            self._file = open(self.path, "w", newline="", buffering=1)
+            self._writer = csv.DictWriter(self._file, fields, restval="")
+            self._writer.writeheader()
+        else:
+            os.truncate(self.path, self._offset)
+            self._file = open(self.path, "a", newline="", buffering=1)
+            self._writer = csv.DictWriter(self._file, fields, restval="")
+
+    @property
+    def stream(self):
+        text = tools.Logbook.stream.fget(self)
+        self.log_header = False # The earlier records were dropped, the header must not be printed again when the rest start at 0
+        return text
+
+    def close(self):
+        '''
+        Closes the CSV file. Recording again opens it again and adds to it.
+        '''
+
+        if self._file is not None:
+            self._offset = self._file.tell()
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self._file is not None:
+            self._file.flush()
+            state["_offset"] = self._file.tell()
+        state["_file"] = None
+        state["_writer"] = None
+        return state
+
+
+def makeLogbook(header, logPath=None):
+    '''
+    :param header: The columns of the logbook.
+    :param logPath: The CSV file the records are streamed to. None keeps the whole logbook in memory.
+    :return: Returns the new logbook.
+    '''
+
+    logbook = tools.Logbook() if logPath is None else StreamingLogbook(logPath)
+    logbook.header = list(header)
+    return logbook
+
+
+def closeLogbook(logbook):
+    '''
+    Closes the CSV file of a streaming logbook at the end of a run. Does nothing for a logbook kept in memory.
+
+    :param logbook: The logbook of the run.
+    '''
+
+    if isinstance(logbook, StreamingLogbook):
+        logbook.close()
+
+
+def loadLog(path):
+    '''
+    Reads a CSV file written by a StreamingLogbook.
+
+    :param path: The CSV file.
+    :return: Returns a numpy structured array with one field per column, for example loadLog(path)["min"].
+    '''
+
+    return numpy.genfromtxt(path, delimiter=",", names=True, ndmin=1)
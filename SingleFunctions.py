@@ -1,31 +1,69 @@
 import operator
+import os
 import random
 import numpy
-import matplotlib.pyplot as plt
 from deap import base
 from deap import benchmarks
 from deap import creator
 from deap import tools
+import Checkpoint
+import EvaluationCache
+import Evaluators
+import Observers
+import Profiling
+import RandomStreams
+import RunLog
+import Topologies
+import SwarmEngine
+import VectorBenchmarks
+import VelocityKernels
 
 # adapted stuff from https://deap.readthedocs.io/en/master/index.html
 
 
+class Particle(list):
+    '''
+    The particle is a list which are the positions for the particle. The class also has the current speed (separated into each axis), the min/max position/speed, and the best location this particle has found.
+    Uses __slots__ instead of a per-particle __dict__ (like the classes made by creator.create have), which makes every particle and best position smaller.
+    '''
+
+    __slots__ = ("fitness", "speed", "smin", "smax", "best", "pmin", "pmax")
+
+    def __init__(self, positions=()):
+        super().__init__(positions)
+        self.fitness = creator.Fitness()
+        self.speed = []
+        self.smin = self.smax = self.best = self.pmin = self.pmax = None
+
+
 def makeCreator():
     '''
     Makes the needed classes to define how the particles in the population are structured.
     Fitness is single-objective minimization.
-    The particle is a list which are the positions for the particle. The class also has the current speed (separated into each axis), the min/max position/speed, and the best location this particle has found.
+    The particle is the Particle class, put on the creator as creator.Particle.
     The limits of position/speed are the same for each dimension in this implementation.
 
     :return: Returns the creator object with the created classes.
     '''
 
     creator.create("Fitness", base.Fitness, weights=(-1.0,))
-    creator.create("Particle", list, fitness=creator.Fitness, speed=list, smin=None, smax=None, best=None, pmin=None, pmax=None)
+    creator.Particle = Particle
     return creator
 
 
-def generateParticle(size, pmin, pmax, smin, smax):
+def copyBest(target, part):
+    '''
+    Copies a particle's positions and fitness into a best position in place, so no new particle is made for each improvement.
+
+    :param target: The best position being overwritten.
+    :param part: The particle whose position is copied.
+    '''
+
+    target[:] = part
+    target.fitness.values = part.fitness.values
+
+
+def generateParticle(size, pmin, pmax, smin, smax, rng=None):
     '''
     This function is used to generate a new, random particle confined to the limits of what the position and speed can be.
     The limits of position/speed are the same for each dimension in this implementation.
@@ -35,19 +73,26 @@ def generateParticle(size, pmin, pmax, smin, smax):
     :param pmax: The maximum position for the particle.
     :param smin: The minimum speed for the particle.
     :param smax: The maximum speed for the particle.
+    :param rng: The run's numpy Generator (see RandomStreams), the positions and speeds are drawn from it in one block. None uses the random module.
     :return: Returns the particle object after it has been made.
     '''
 
-    part = creator.Particle(random.uniform(pmin, pmax) for _ in range(size))  # Create two positions for x, y coordinates
-    part.speed = [random.uniform(smin, smax) for _ in range(size)] # Create the x, y speeds
+    if rng is None:
+        part = creator.Particle(random.uniform(pmin, pmax) for _ in range(size))  # Create two positions for x, y coordinates
+        part.speed = [random.uniform(smin, smax) for _ in range(size)] # Create the x, y speeds
+    else:
+        positions, speeds = rng.random((2, size)).tolist()
+        part = creator.Particle(pmin + (pmax - pmin) * u for u in positions)
+        part.speed = [smin + (smax - smin) * u for u in speeds]
     part.smin = smin
     part.smax = smax
     part.pmin = pmin
     part.pmax = pmax
+    part.best = creator.Particle() # Empty until the first evaluation, then overwritten in place
     return part
 
 
-def updateParticle(particle, best, phi1, phi2):
+def updateParticle(particle, best, phi1, phi2, weights=None):
     '''
     Updates the particle's speed and then position with the newly calculated speed.
     The speed changes based on the best position this current particle has found and the best overall particle.
@@ -56,10 +101,15 @@ def updateParticle(particle, best, phi1, phi2):
     :param best: The best particle that has been found overall.
     :param phi1: The maximum weight this particle's best position should have on the updated speed
     :param phi2: The maximum weight the overall best particle's position should have on the updated speed
+    :param weights: The particle's uniform [0, 1) weights for its best position and the best particle's position, drawn for the whole population at once (see RandomStreams.updateWeights). None draws them from the random module.
     '''
     
-    u1 = (random.uniform(0, phi1) for _ in range(len(particle))) # Generate a random weight for this particle's best position (for each dimension)
-    u2 = (random.uniform(0, phi2) for _ in range(len(particle))) # Generate a random weight for the overall best particle's position (for each dimension)
+    if weights is None:
+        u1 = (random.uniform(0, phi1) for _ in range(len(particle))) # Generate a random weight for this particle's best position (for each dimension)
+        u2 = (random.uniform(0, phi2) for _ in range(len(particle))) # Generate a random weight for the overall best particle's position (for each dimension)
+    else:
+        u1 = (phi1 * w for w in weights[0])
+        u2 = (phi2 * w for w in weights[1])
     v_u1 = map(operator.mul, u1, map(operator.sub, particle.best, particle)) # The amount of pull to this particle's best positon
     v_u2 = map(operator.mul, u2, map(operator.sub, best, particle)) # The amount of pull to the best particle's position
     particle.speed = list(map(operator.add, particle.speed, map(operator.add, v_u1, v_u2))) # The combination of the pull
@@ -102,12 +152,11 @@ def graphsingle(pop):
     :param pop: The list of all the particles in the swarm
     :return: Nothing is fully returned as a plot is shown instead.
     '''
+    import matplotlib.pyplot as plt # Only needed when plotting is asked for
+
     # Creates the heatmap for the values of -510 - 510 for the X, Y values. 
     # The color is based on the error for the Schwefel function of that X, Y position (lighter is better as it is closer to 0)
-    X = numpy.arange(-510, 510, 10)
-    Y = numpy.arange(-510, 510, 10)
-    X, Y = numpy.meshgrid(X, Y)
-    Z = numpy.fromiter(map(schwefel_arg0, zip(X.flat,Y.flat)), dtype=float, count=X.shape[0]*X.shape[1]).reshape(X.shape)
+    X, Y, Z = VectorBenchmarks.cachedGrid(VectorBenchmarks.schwefel, (-510, 510, 10), (-510, 510, 10))
     fig, (ax1) = plt.subplots(1, 1)
     fig.subplots_adjust(hspace=10)
     plot1 = ax1.contourf(X, Y, Z, cmap='Greens')
@@ -127,7 +176,55 @@ def graphsingle(pop):
     plt.show()
 
 
-def makeToolbox(smin, smax, pmin, pmax):
+def populationToArrays(pop, best):
+    '''
+    Packs the state of the particles and the best particle into arrays, for checkpoints.
+
+    :param pop: The list of all the particles in the swarm
+    :param best: The best particle that has been found overall.
+    :return: Returns the dict of arrays.
+    '''
+
+    return {
+        "positions": numpy.array(pop, dtype=float),
+        "speeds": numpy.array([part.speed for part in pop], dtype=float),
+        "best_positions": numpy.array([part.best for part in pop], dtype=float),
+        "best_fitness": numpy.array([part.best.fitness.values for part in pop], dtype=float),
+        "gbest_position": numpy.array(best, dtype=float),
+        "gbest_fitness": numpy.array(best.fitness.values, dtype=float),
+    }
+
+
+def arraysToPopulation(arrays, smin, smax, pmin, pmax):
+    '''
+    Rebuilds the particles and the best particle from the arrays of populationToArrays.
+
+    :param arrays: The dict of arrays.
+    :param smin: The minimum speed for a particle. 
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :return: Returns the list of particles and the best particle.
+    '''
+
+    pop = []
+    for position, speed, bestPosition, bestFitness in zip(arrays["positions"].tolist(), arrays["speeds"].tolist(),
+                                                           arrays["best_positions"].tolist(), arrays["best_fitness"].tolist()):
+        part = creator.Particle(position)
+        part.speed = speed
+        part.smin = smin
+        part.smax = smax
+        part.pmin = pmin
+        part.pmax = pmax
+        part.best = creator.Particle(bestPosition)
+        part.best.fitness.values = tuple(bestFitness)
+        pop.append(part)
+    best = creator.Particle(arrays["gbest_position"].tolist())
+    best.fitness.values = tuple(arrays["gbest_fitness"].tolist())
+    return pop, best
+
+
+def makeToolbox(smin, smax, pmin, pmax, executor=None, cacheSize=0, cacheQuantum=None, phi1=2.0, phi2=2.0, rng=None, objective=None, vectorized=True):
     '''
     Makes the toolbox which contains the functions needed to perform the particle swarm optimization.
 
@@ -135,19 +232,47 @@ def makeToolbox(smin, smax, pmin, pmax):
     :param smax: The maximum speed for a particle.
     :param pmin: The minimum position for a particle.
     :param pmax: The maximum position for a particle.
+    :param executor: The concurrent.futures executor the population is evaluated on in chunks (see Evaluators.makeExecutor). None evaluates serially.
+    :param cacheSize: The number of evaluated positions to remember so they are not evaluated again. 0 turns the cache off.
+    :param cacheQuantum: The grid size positions are rounded to for the cache. None only reuses exactly equal positions.
+    :param phi1: The maximum weight a particle's best position should have on the updated speed
+    :param phi2: The maximum weight the best particle's position should have on the updated speed
+    :param rng: The run's numpy Generator the particles are made from, None uses the random module.
+    :param objective: The objective function minimized instead of the Schwefel function, or the name of a VectorBenchmarks objective. It is evaluated in chunks on the executor, so for process pools it has to be picklable.
+    :param vectorized: Bool for if the objective takes the whole (n, dim) positions at once (like VectorBenchmarks) instead of one particle at a time (like deap.benchmarks). Names are always vectorized.
     '''
 
     toolbox = base.Toolbox()
-    toolbox.register("particle", generateParticle, size=2, pmin=pmin, pmax=pmax, smin=smin, smax=smax)
+    toolbox.register("particle", generateParticle, size=2, pmin=pmin, pmax=pmax, smin=smin, smax=smax, rng=rng)
     toolbox.register("population", tools.initRepeat, list, toolbox.particle)
-    toolbox.register("update", updateParticle, phi1=2.0, phi2=2.0)
-    toolbox.register("evaluatesingle", benchmarks.schwefel)
+    toolbox.register("update", updateParticle, phi1=phi1, phi2=phi2)
+    if objective is None:
+        toolbox.register("evaluatesingle", benchmarks.schwefel)
+        toolbox.register("evaluatesinglebatch", Evaluators.ChunkedEvaluator(VectorBenchmarks.schwefel, executor)) # Scores the whole population in one call
+    else:
+        if isinstance(objective, str):
+            objective, vectorized = VectorBenchmarks.getObjective(objective), True
+        evaluate = Evaluators.ChunkedEvaluator(objective, executor, vectorized)
+        toolbox.register("evaluatesingle", evaluate.single)
+        toolbox.register("evaluatesinglebatch", evaluate)
+
+    # Optionally both evaluations go through one cache of the positions already evaluated
+    if cacheSize:
+        cache = EvaluationCache.CachedEvaluator(toolbox.evaluatesinglebatch, cacheSize, cacheQuantum)
+        toolbox.register("evaluatesingle", cache.single)
+        toolbox.register("evaluatesinglebatch", cache)
+        toolbox.register("cachecounters", cache.counters)
+        toolbox.register("cachestate", cache.state)
+        toolbox.register("setcachestate", cache.setState)
     return toolbox
 
 
-def singleObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen):
+def singleObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen, executor=None, cacheSize=0, cacheQuantum=None,
+              checkpointPath=None, checkpointInterval=0, resume=False, instrument=None, recordInterval=1, logPath=None, stop=None, phi1=2.0, phi2=2.0, topology=None, seed=None, kernel=None,
+              objective=None, vectorized=True):
     '''
-    Performs the single minimization objective particle swarm optimization for the Schwefel function
+    Performs the single minimization objective particle swarm optimization for the Schwefel function, graphing the particles before and after and printing the stats of each generation.
+    See runSingleObj for the same run without any plotting or printing.
 
     :param smin: The minimum speed for a particle. 
     :param smax: The maximum speed for a particle.
@@ -156,49 +281,169 @@ def singleObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen):
     :param n_pop: Number of particles to have in the population
     :param n_gen: Number of generations to iterate (number of times particles move)
     :param bestPerGen: Bool for if the best particle should be reset each generation
+    :param executor: The concurrent.futures executor the population is evaluated on in chunks. None evaluates serially.
+    :param cacheSize: The number of evaluated positions to remember so they are not evaluated again. 0 turns the cache off.
+    :param cacheQuantum: The grid size positions are rounded to for the cache. None only reuses exactly equal positions.
+    :param checkpointPath: The file the state of the run is saved to every checkpointInterval generations (see Checkpoint). None turns checkpointing off.
+    :param checkpointInterval: The number of generations between checkpoints.
+    :param resume: Bool for if the run should continue from the checkpoint file if it exists. Gives the same results as a run that was never stopped, the cache and its hits/misses are saved in the checkpoint too.
+    :param instrument: A Profiling.Instrumentation recording the time of each phase, the allocations and garbage collections of each generation as extra logbook columns. None turns it off.
+    :param recordInterval: The stats are only calculated and recorded every recordInterval generations (and for the first and last ones).
+    :param logPath: The CSV file the logbook rows are streamed to, only the last row is kept in memory (see RunLog.StreamingLogbook). None keeps the whole logbook.
+    :param stop: A Termination.StopCriteria to end the run early. Why it stopped is printed at the end. None always runs n_gen generations.
+    :param phi1: The maximum weight a particle's best position should have on the updated speed
+    :param phi2: The maximum weight the best particle's position should have on the updated speed
+    :param topology: A Topologies topology or its name ("ring", "vonneumann", "random", "knn"), each particle then follows the best of its neighborhood instead of the best particle. None is the global best topology.
+    :param seed: The seed of the run's own random number stream (an int, numpy SeedSequence or Generator, see RandomStreams), its numbers are drawn one block per generation. None draws from the random module.
+    :param kernel: A VelocityKernels kernel (or its name: "linear", "constriction", "adaptive") the speeds are updated with, all the particles at once. None adds the pulls onto the speeds.
+    :param objective: The objective function minimized instead of the Schwefel function, or the name of a VectorBenchmarks objective. It is evaluated in chunks on the executor, so for process pools it has to be picklable.
+    :param vectorized: Bool for if the objective takes the whole (n, dim) positions at once (like VectorBenchmarks) instead of one particle at a time (like deap.benchmarks). Names are always vectorized.
     :return: Nothing is returned as the results are printed. Could add a way to save the results.
     '''
 
+    runSingleObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen, executor, cacheSize, cacheQuantum,
+                 observers=[Observers.PlotObserver(graphsingle), Observers.PrintObserver()],
+                 checkpointPath=checkpointPath, checkpointInterval=checkpointInterval, resume=resume, instrument=instrument,
+                 recordInterval=recordInterval, logPath=logPath, stop=stop, phi1=phi1, phi2=phi2, topology=topology, seed=seed, kernel=kernel,
+                 objective=objective, vectorized=vectorized)
+    if stop is not None and stop.reason is not None:
+        print("Stopped after generation %d: %s" % (stop.generation, stop.reason))
+
+
+def runSingleObj(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen, executor=None, cacheSize=0, cacheQuantum=None, observers=(),
+                 checkpointPath=None, checkpointInterval=0, resume=False, instrument=None, recordInterval=1, logPath=None, stop=None, phi1=2.0, phi2=2.0, topology=None, seed=None, kernel=None,
+                 objective=None, vectorized=True):
+    '''
+    Performs the single minimization objective particle swarm optimization for the Schwefel function (or the given objective) without plotting or printing anything.
+
+    :param smin: The minimum speed for a particle. 
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :param n_pop: Number of particles to have in the population
+    :param n_gen: Number of generations to iterate (number of times particles move)
+    :param bestPerGen: Bool for if the best particle should be reset each generation
+    :param executor: The concurrent.futures executor the population is evaluated on in chunks. None evaluates serially.
+    :param cacheSize: The number of evaluated positions to remember so they are not evaluated again. 0 turns the cache off.
+    :param cacheQuantum: The grid size positions are rounded to for the cache. None only reuses exactly equal positions.
+    :param observers: The Observers.Observer objects called at the start, after each generation and at the end of the run (for printing, plotting, ...).
+    :param checkpointPath: The file the state of the run is saved to every checkpointInterval generations (see Checkpoint). None turns checkpointing off.
+    :param checkpointInterval: The number of generations between checkpoints.
+    :param resume: Bool for if the run should continue from the checkpoint file if it exists. Gives the same results as a run that was never stopped, the cache and its hits/misses are saved in the checkpoint too.
+    :param instrument: A Profiling.Instrumentation recording the time of each phase, the allocations and garbage collections of each generation as extra logbook columns. None turns it off.
+    :param recordInterval: The stats are only calculated and recorded every recordInterval generations (and for the first and last ones).
+    :param logPath: The CSV file the logbook rows are streamed to, only the last row is kept in memory (see RunLog.StreamingLogbook). None keeps the whole logbook.
+    :param stop: A Termination.StopCriteria checked after each generation, the run ends early when one of its criteria is met and its reason says which. None always runs n_gen generations.
+    :param phi1: The maximum weight a particle's best position should have on the updated speed
+    :param phi2: The maximum weight the best particle's position should have on the updated speed
+    :param topology: A Topologies topology or its name ("ring", "vonneumann", "random", "knn"), each particle then follows the best of its neighborhood instead of the best particle. None is the global best topology.
+    :param seed: The seed of the run's own random number stream (an int, numpy SeedSequence or Generator, see RandomStreams), its numbers are drawn one block per generation. None draws from the random module.
+    :param kernel: A VelocityKernels kernel (or its name: "linear", "constriction", "adaptive") the speeds are updated with, all the particles at once. None adds the pulls onto the speeds.
+    :param objective: The objective function minimized instead of the Schwefel function, or the name of a VectorBenchmarks objective. It is evaluated in chunks on the executor, so for process pools it has to be picklable.
+    :param vectorized: Bool for if the objective takes the whole (n, dim) positions at once (like VectorBenchmarks) instead of one particle at a time (like deap.benchmarks). Names are always vectorized.
+    :return: Returns the final population, the best particle found and the logbook of the run.
+    '''
+
     # Sets up the needed classes/functions and the stats to track over the generations
+    rng = RandomStreams.makeRng(seed)
+    topology = Topologies.getTopology(topology)
     creator = makeCreator()
-    toolbox = makeToolbox(smin, smax, pmin, pmax)
-    stats = tools.Statistics(lambda ind: ind.fitness.values)
-    stats.register("avg", numpy.mean)
-    stats.register("std", numpy.std)
-    stats.register("min", numpy.min)
-    stats.register("max", numpy.max)
-    logbook = tools.Logbook()
-    logbook.header = ["gen", "evals"] + stats.fields
+    toolbox = makeToolbox(smin, smax, pmin, pmax, executor, cacheSize, cacheQuantum, phi1, phi2, rng, objective, vectorized)
+    logbook = RunLog.makeLogbook(["gen", "evals"] + RunLog.statFields([""]), logPath)
+    cached = hasattr(toolbox, "cachecounters")
+    if cached:
+        logbook.header += ["hits", "misses"] # Total cache hits/misses so far
+    instrument = instrument or Profiling.DISABLED
+    logbook.header += instrument.fields
     
-    # Makes the intitial particles and graphs where they start
-    pop = toolbox.population(n=n_pop)
-    graphsingle(pop)
+    # Makes the intitial particles, or picks up where the checkpoint left off
+    startGen = 0
+    if resume and checkpointPath is not None and os.path.exists(checkpointPath):
+        arrays, generation, logbook = Checkpoint.loadCheckpoint(checkpointPath, rng)
+        pop, best = arraysToPopulation(arrays, smin, smax, pmin, pmax)
+        if topology is not None:
+            topology.setState(arrays)
+        if cached:
+            toolbox.setcachestate(arrays)
+        startGen = generation + 1
+    else:
+        pop = toolbox.population(n=n_pop)
+        best = creator.Particle() # The fitness stays invalid until the first evaluation
+    if stop is not None:
+        stop.start()
+    if kernel is not None:
+        kernel = VelocityKernels.getKernel(kernel)
+        kernel.start(phi1, phi2, n_gen)
+    Observers.notify(observers, "start", pop)
     
-    best = None
-    for generation in range(n_gen):
-        # If enabled, only the best current particle will have an influence on the others. Not the overall best one found 
-        if bestPerGen:
-            best=None
-        for part in pop:
-            part.fitness.values = toolbox.evaluatesingle(part)
-
-            # Keeping track of the best position for each unique particle
-            if not part.best or part.best.fitness.values > part.fitness.values:
-                part.best = creator.Particle(part)
-                part.best.fitness.values = part.fitness.values
+    instrument.startRun()
+    try:
+        for generation in range(startGen, n_gen):
+            instrument.startGeneration()
+            previous = best.fitness.values if best.fitness.valid else None # Kept before the reset, for the topologies to know if the best improved
+            # If enabled, only the best current particle will have an influence on the others. Not the overall best one found 
+            if bestPerGen:
+                del best.fitness.values
+            with instrument.phase("evaluate"):
+                fitnesses = toolbox.evaluatesinglebatch(numpy.array(pop))
+            with instrument.phase("bests"):
+                success = 0 # The number of particles whose best position improved, for the velocity kernel
+                for part, fit in zip(pop, fitnesses):
+                    part.fitness.values = (fit,)
+
+                    # Keeping track of the best position for each unique particle
+                    if not part.best.fitness.valid or part.best.fitness.values > part.fitness.values:
+                        copyBest(part.best, part)
+                        success += 1
+                    
+                    # Keeping track of the best particle found
+                    if not best.fitness.valid or best.fitness.values > part.fitness.values:
+                        copyBest(best, part)
+
+                # With a topology each particle follows the best of its own neighborhood
+                if topology is not None:
+                    leaders = topology.leaders(numpy.array(pop), numpy.array([[part.best for part in pop]]),
+                                               numpy.array([[part.best.fitness.values[0] for part in pop]]),
+                                               previous is None or best.fitness.values < previous, rng)[0].tolist()
+            
+            # Updates the positions (and speeds) of each particle
+            with instrument.phase("update"):
+                if kernel is not None:
+                    # The kernel updates every particle at once on arrays
+                    kernel.step(generation, success / len(pop))
+                    SwarmEngine.movePopulation(pop, [[part.best for part in pop]], [best] if topology is None else [leaders],
+                                               phi1, phi2, smin, smax, pmin, pmax, rng, kernel)
+                else:
+                    weights = RandomStreams.updateWeights(rng, len(pop), len(pop[0]), 1) if rng is not None else [None] * len(pop)
+                    if topology is None:
+                        for part, w in zip(pop, weights):
+                            toolbox.update(part, best, weights=w)
+                    else:
+                        for part, leader, w in zip(pop, leaders, weights):
+                            toolbox.update(part, leader, weights=w)
             
-            # Keeping track of the best particle found
-            if not best or best.fitness.values > part.fitness.values:
-                best = creator.Particle(part)
-                best.fitness.values = part.fitness.values
-        
-        # Updates the positions (and speeds) of each particle
-        for part in pop:
-            toolbox.update(part, best)
-        
-        # Records various stats about the fitness for the population each generation
-        logbook.record(gen=generation, evals=len(pop), **stats.compile(pop))
-        print(logbook.stream)
+            # Checks if the run should stop early. The arrays of the moved particles are only made for the criteria that need them
+            reason = None
+            if stop is not None:
+                current = numpy.array(pop) if stop.needsPositions else None
+                speeds = numpy.array([part.speed for part in pop]) if stop.needsSpeeds else None
+                reason = stop.check(generation, (generation + 1) * len(pop), best.fitness.values, current, speeds)
+
+            # Records various stats about the fitness for the population each generation (or every recordInterval generations), straight from the evaluated array
+            if RunLog.shouldRecord(recordInterval, generation, n_gen) or reason:
+                with instrument.phase("stats"):
+                    record = RunLog.fitnessStats(fitnesses)
+                logbook.record(gen=generation, evals=len(pop), **record, **(toolbox.cachecounters() if cached else {}), **instrument.columns())
+            Observers.notify(observers, "generation", generation, pop, best, logbook)
+            # A stopped run is at its last generation, which always gets a checkpoint
+            if Checkpoint.shouldCheckpoint(checkpointPath, checkpointInterval, generation, generation + 1 if reason else n_gen):
+                Checkpoint.saveCheckpoint(checkpointPath, {**populationToArrays(pop, best), **(topology.state() if topology is not None else {}),
+                                                           **(toolbox.cachestate() if cached else {})}, generation, logbook, rng)
+            if reason:
+                break
+    finally:
+        instrument.endRun()
+        RunLog.closeLogbook(logbook)
     
-    # Re-graph the particles after they have moved around
-    graphsingle(pop)
\ No newline at end of file
+    Observers.notify(observers, "end", pop, best, logbook)
+    return pop, best, logbook
\ No newline at end of file
@@ -0,0 +1,380 @@
+import itertools
+import random
+import os
+import numpy
+import Checkpoint
+import Observers
+import Profiling
+import RandomStreams
+import RunLog
+import Topologies
+import VectorBenchmarks
+import VelocityKernels
+
+# Structure-of-arrays version of the particle swarm in SingleFunctions.py/MultiFunctions.py.
+# Every particle is a row in a (n_pop, dim) array instead of a creator.Particle object so each step of a generation is one batched numpy operation.
+
+
+class Swarm:
+    '''
+    Holds the whole swarm as arrays. Row i of every per-particle array belongs to particle i.
+    The limits of position/speed are the same for each dimension in this implementation.
+
+    positions, speeds: (n_pop, dim) current position and speed of each particle.
+    fitness: (n_pop, n_obj) fitness of each particle at its current position.
+    best_positions, best_fitness: (n_obj, n_pop, dim) and (n_obj, n_pop), the best position each particle has found for each objective.
+    gbest_positions, gbest_fitness: (n_obj, dim) and (n_obj,), the best position found by the swarm for each objective.
+    gbest_positions can also be set to a (n_obj, n_pop, dim) array to give every particle its own leader to be pulled towards.
+    '''
+
+    __slots__ = ("positions", "speeds", "fitness", "best_positions", "best_fitness", "gbest_positions", "gbest_fitness",
+                 "smin", "smax", "pmin", "pmax")
+
+    def __init__(self, positions, speeds, n_obj, pmin, pmax, smin, smax):
+        n_pop, dim = positions.shape
+        self.positions = positions
+        self.speeds = speeds
+        self.fitness = numpy.full((n_pop, n_obj), numpy.inf)
+        self.best_positions = numpy.zeros((n_obj, n_pop, dim))
+        self.best_fitness = numpy.full((n_obj, n_pop), numpy.inf)
+        self.gbest_positions = numpy.zeros((n_obj, dim))
+        self.gbest_fitness = numpy.full(n_obj, numpy.inf)
+        self.smin = smin
+        self.smax = smax
+        self.pmin = pmin
+        self.pmax = pmax
+
+    def __len__(self):
+        return self.positions.shape[0]
+
+    def resetGlobalBest(self):
+        '''
+        Forgets the best positions found by the swarm so only the current generation's particles can become the new global best.
+        '''
+
+        self.gbest_positions[:] = 0.0
+        self.gbest_fitness[:] = numpy.inf
+
+    def toArrays(self):
+        '''
+        :return: Returns the dict of every field of the swarm as numpy arrays, for checkpoints.
+        '''
+
+        return {name: numpy.asarray(getattr(self, name)) for name in self.__slots__}
+
+    @classmethod
+    def fromArrays(cls, arrays):
+        '''
+        Rebuilds a swarm from the arrays of toArrays.
+
+        :param arrays: The dict of the swarm's fields.
+        :return: Returns the swarm.
+        '''
+
+        swarm = cls.__new__(cls)
+        for name in cls.__slots__:
+            value = arrays[name]
+            setattr(swarm, name, value.item() if value.ndim == 0 else numpy.array(value))
+        return swarm
+
+
+def uniformBlock(shape, rng=None):
+    '''
+    Draws a block of uniform [0, 1) numbers from the run's Generator, or from the global random module when there is none.
+    The numbers come out in the same order as the one-at-a-time random.uniform calls of the DEAP particles, so a seeded run gives the same swarm.
+
+    :param shape: The shape of the returned array. The last axis is filled first.
+    :param rng: The run's numpy Generator (see RandomStreams). None uses the random module.
+    :return: Returns the array of random numbers.
+    '''
+
+    if rng is not None:
+        return rng.random(shape)
+    count = int(numpy.prod(shape))
+    return numpy.fromiter(itertools.islice(iter(random.random, None), count), dtype=float, count=count).reshape(shape)
+
+
+def generateSwarm(n_pop, size, pmin, pmax, smin, smax, n_obj=1, rng=None):
+    '''
+    Generates a new swarm of random particles confined to the limits of what the position and speed can be.
+    Draws the random numbers in the same order as calling generateParticle n_pop times.
+
+    :param n_pop: Number of particles to have in the swarm
+    :param size: The number of dimensions for the particles (2D, 3D, etc.)
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :param smin: The minimum speed for a particle.
+    :param smax: The maximum speed for a particle.
+    :param n_obj: The number of objectives the swarm is tracking bests for.
+    :param rng: The run's numpy Generator (see RandomStreams). None uses the random module.
+    :return: Returns the swarm object after it has been made.
+    '''
+
+    block = uniformBlock((n_pop, 2, size), rng) # Each particle draws all its positions and then all its speeds
+    positions = pmin + (pmax - pmin) * block[:, 0, :]
+    speeds = smin + (smax - smin) * block[:, 1, :]
+    return Swarm(positions, speeds, n_obj, pmin, pmax, smin, smax)
+
+
+def evaluateSwarm(swarm, evaluate):
+    '''
+    Scores every particle of the swarm at its current position.
+
+    :param swarm: The swarm being evaluated.
+    :param evaluate: Function taking the (n_pop, dim) positions and returning the (n_pop,) or (n_pop, n_obj) fitness.
+    '''
+
+    swarm.fitness[:] = numpy.asarray(evaluate(swarm.positions), dtype=float).reshape(swarm.fitness.shape)
+
+
+def updateBests(swarm):
+    '''
+    Updates the best position of each particle and of the whole swarm for every objective.
+    A best only gets replaced by a strictly better fitness, and ties in a generation go to the earliest particle, the same as the DEAP loops.
+
+    :param swarm: The swarm whose bests are updated, after it has been evaluated.
+    :return: Returns the (n_pop,) bool array of the particles whose best position improved for at least one objective.
+    '''
+
+    success = numpy.zeros(len(swarm), dtype=bool)
+    for k in range(swarm.fitness.shape[1]):
+        fit = swarm.fitness[:, k]
+
+        # Keeping track of the best position for each unique particle
+        improved = fit < swarm.best_fitness[k]
+        swarm.best_positions[k][improved] = swarm.positions[improved]
+        swarm.best_fitness[k][improved] = fit[improved]
+        success |= improved
+
+        # Keeping track of the best particle found
+        i = numpy.argmin(fit)
+        if fit[i] < swarm.gbest_fitness[k]:
+            swarm.gbest_positions[k] = swarm.positions[i]
+            swarm.gbest_fitness[k] = fit[i]
+    return success
+
+
+def updateSwarm(swarm, phi1, phi2, leaders=None, rng=None, kernel=None):
+    '''
+    Updates the speed and then the position of every particle at once.
+    For each objective the speed is pulled towards the particle's best position and the swarm's best position (or the particle's own leader), the same as updateParticle/updateParticleMulti.
+
+    :param swarm: The swarm being updated.
+    :param phi1: The maximum weight a particle's best positions should have on the updated speed
+    :param phi2: The maximum weight the swarm's best positions should have on the updated speed
+    :param leaders: The (n_obj, n_pop, dim) position each particle is pulled towards instead of the swarm's best (see Topologies). None uses the swarm's best.
+    :param rng: The run's numpy Generator the generation's weights are drawn from in one block (see RandomStreams). None uses the random module.
+    :param kernel: The VelocityKernels kernel the speeds are updated with. None adds the pulls onto the speeds.
+    '''
+
+    if leaders is None:
+        leaders = swarm.gbest_positions
+    moveParticles(swarm.positions, swarm.speeds, swarm.best_positions, leaders, phi1, phi2, swarm.smin, swarm.smax, swarm.pmin, swarm.pmax, rng, kernel)
+
+
+def moveParticles(positions, speeds, bestPositions, leaders, phi1, phi2, smin, smax, pmin, pmax, rng=None, kernel=None):
+    '''
+    Updates the speeds and then the positions arrays of a population in place. This is the array form of updateParticle/updateParticleMulti, the DEAP runs use it for the velocity kernels.
+
+    :param positions: The (n_pop, dim) positions of the particles.
+    :param speeds: The (n_pop, dim) speeds of the particles.
+    :param bestPositions: The (n_obj, n_pop, dim) best positions of the particles.
+    :param leaders: The (n_obj, dim) best positions of the swarm, or the (n_obj, n_pop, dim) leader of each particle.
+    :param phi1: The maximum weight a particle's best positions should have on the updated speed
+    :param phi2: The maximum weight the leaders' positions should have on the updated speed
+    :param smin: The minimum speed for a particle.
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :param rng: The run's numpy Generator the weights are drawn from in one block (see RandomStreams). None uses the random module.
+    :param kernel: The VelocityKernels kernel the speeds are updated with. None adds the pulls onto the speeds.
+    '''
+
+    n_obj = len(bestPositions)
+    u = uniformBlock(positions.shape + (n_obj, 2), rng) # Per dimension, the particle's weight then the swarm's weight for each objective
+    pull = None
+    for k in range(n_obj):
+        pull_k = phi1 * u[:, :, k, 0] * (bestPositions[k] - positions) \
+            + phi2 * u[:, :, k, 1] * (leaders[k] - positions)
+        pull = pull_k if pull is None else pull + pull_k
+
+    # The combination of the pulls plus the current speed, limited to the potential min/max
+    if kernel is None:
+        speeds += pull
+    else:
+        kernel.velocity(speeds, pull)
+    numpy.clip(speeds, smin, smax, out=speeds)
+
+    # Calculates the new positions, limited to within bounds
+    positions += speeds
+    numpy.clip(positions, pmin, pmax, out=positions)
+
+
+def movePopulation(pop, bestPositions, leaders, phi1, phi2, smin, smax, pmin, pmax, rng=None, kernel=None):
+    '''
+    Updates a population of DEAP particles (lists with a speed) through the arrays of moveParticles, so the velocity kernels work on them in one batched operation.
+
+    :param pop: The particles being updated.
+    :param bestPositions: The (n_obj, n_pop, dim) best positions of the particles.
+    :param leaders: The (n_obj, dim) best particles, or the (n_obj, n_pop, dim) leader of each particle.
+    :param phi1: The maximum weight a particle's best positions should have on the updated speed
+    :param phi2: The maximum weight the leaders' positions should have on the updated speed
+    :param smin: The minimum speed for a particle.
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :param rng: The run's numpy Generator (see RandomStreams). None uses the random module.
+    :param kernel: The VelocityKernels kernel the speeds are updated with. None adds the pulls onto the speeds.
+    '''
+
+    positions = numpy.array(pop, dtype=float)
+    speeds = numpy.array([part.speed for part in pop], dtype=float)
+    moveParticles(positions, speeds, numpy.asarray(bestPositions, dtype=float), numpy.asarray(leaders, dtype=float),
+                  phi1, phi2, smin, smax, pmin, pmax, rng, kernel)
+    for part, position, speed in zip(pop, positions.tolist(), speeds.tolist()):
+        part[:] = position
+        part.speed = speed
+
+
+def recordStats(logbook, swarm, generation, suffixes=None):
+    '''
+    Records the avg/std/min/max of the swarm's fitness for each objective in the logbook.
+
+    :param logbook: The logbook the generation is recorded in.
+    :param swarm: The swarm being recorded, after it has been evaluated.
+    :param generation: The current generation number.
+    :param suffixes: The suffix put after each stat name for each objective, "" for a single objective if not given.
+    '''
+
+    logbook.record(gen=generation, evals=len(swarm), **RunLog.fitnessStats(swarm.fitness, suffixes))
+
+
+def runSwarm(swarm, evaluate, n_gen, bestPerGen, phi1=2.0, phi2=2.0, observers=(), logbook=None, startGen=0,
+             checkpointPath=None, checkpointInterval=0, instrument=None, recordInterval=1, logPath=None, stop=None, topology=None, rng=None, kernel=None):
+    '''
+    Runs the generational particle swarm optimization loop on an existing swarm.
+
+    :param swarm: The swarm being optimized.
+    :param evaluate: Function taking the (n_pop, dim) positions and returning the (n_pop,) or (n_pop, n_obj) fitness.
+    :param n_gen: Number of generations to iterate (number of times particles move)
+    :param bestPerGen: Bool for if the best particle should be reset each generation
+    :param phi1: The maximum weight a particle's best positions should have on the updated speed
+    :param phi2: The maximum weight the swarm's best positions should have on the updated speed
+    :param observers: The Observers.Observer objects called with the positions array and the (n_obj, dim) best positions of the swarm.
+    :param logbook: The logbook to keep recording in when resuming. A new one is made if not given.
+    :param startGen: The first generation to run, when resuming.
+    :param checkpointPath: The file the state of the run is saved to (see Checkpoint). None turns checkpointing off.
+    :param checkpointInterval: The number of generations between checkpoints.
+    :param instrument: A Profiling.Instrumentation recording the time of each phase, the allocations and garbage collections of each generation as extra logbook columns. None turns it off.
+    :param recordInterval: The stats are only calculated and recorded every recordInterval generations (and for the first and last ones).
+    :param logPath: The CSV file the logbook rows are streamed to, only the last row is kept in memory (see RunLog.StreamingLogbook). None keeps the whole logbook.
+    :param stop: A Termination.StopCriteria checked after each generation, the run ends early when one of its criteria is met and its reason says which. None always runs n_gen generations.
+    :param topology: A Topologies topology (or its name), each particle then follows the best of its neighborhood instead of the swarm's best. None is the global best topology.
+    :param rng: The run's numpy Generator (see RandomStreams), its state is saved in the checkpoints. None uses the random module.
+    :param kernel: A VelocityKernels kernel (or its name) the speeds are updated with, for example inertia or constriction. None adds the pulls onto the speeds.
+    :return: Returns the logbook with the stats about the fitness for each generation.
+    '''
+
+    instrument = instrument or Profiling.DISABLED
+    suffixes = [""] if swarm.fitness.shape[1] == 1 else [str(k + 1) for k in range(swarm.fitness.shape[1])]
+    if logbook is None:
+        logbook = RunLog.makeLogbook(["gen", "evals"] + RunLog.statFields(suffixes) + instrument.fields, logPath)
+
+    if stop is not None:
+        stop.start()
+    topology = Topologies.getTopology(topology)
+    if kernel is not None:
+        kernel = VelocityKernels.getKernel(kernel)
+        kernel.start(phi1, phi2, n_gen)
+    Observers.notify(observers, "start", swarm.positions)
+    instrument.startRun()
+    try:
+        for generation in range(startGen, n_gen):
+            instrument.startGeneration()
+            previous = swarm.gbest_fitness.copy() # Kept before the reset, for the topologies to know if the best improved
+            # If enabled, only the best current particle will have an influence on the others. Not the overall best one found
+            if bestPerGen:
+                swarm.resetGlobalBest()
+            with instrument.phase("evaluate"):
+                evaluateSwarm(swarm, evaluate)
+            with instrument.phase("bests"):
+                success = updateBests(swarm)
+                leaders = None
+                if topology is not None:
+                    improved = bool(numpy.any(swarm.gbest_fitness < previous))
+                    leaders = topology.leaders(swarm.positions, swarm.best_positions, swarm.best_fitness, improved, rng)
+            with instrument.phase("update"):
+                if kernel is not None:
+                    kernel.step(generation, success.mean())
+                updateSwarm(swarm, phi1, phi2, leaders, rng, kernel)
+            reason = stop.check(generation, (generation + 1) * len(swarm), swarm.gbest_fitness, swarm.positions, swarm.speeds) if stop is not None else None
+            if RunLog.shouldRecord(recordInterval, generation, n_gen) or reason:
+                with instrument.phase("stats"):
+                    record = RunLog.fitnessStats(swarm.fitness, suffixes)
+                logbook.record(gen=generation, evals=len(swarm), **record, **instrument.columns())
+            Observers.notify(observers, "generation", generation, swarm.positions, swarm.gbest_positions, logbook)
+            # A stopped run is at its last generation, which always gets a checkpoint
+            if Checkpoint.shouldCheckpoint(checkpointPath, checkpointInterval, generation, generation + 1 if reason else n_gen):
+                Checkpoint.saveCheckpoint(checkpointPath, {**swarm.toArrays(), **(topology.state() if topology is not None else {})}, generation, logbook, rng)
+            if reason:
+                break
+    finally:
+        instrument.endRun()
+        RunLog.closeLogbook(logbook)
+    Observers.notify(observers, "end", swarm.positions, swarm.gbest_positions, logbook)
+    return logbook
+
+
+def singleObjVectorized(smin, smax, pmin, pmax, n_pop, n_gen, bestPerGen, size=2, evaluate=None, observers=(),
+                        checkpointPath=None, checkpointInterval=0, resume=False, instrument=None, recordInterval=1, logPath=None, stop=None,
+                        phi1=2.0, phi2=2.0, topology=None, seed=None, kernel=None):
+    '''
+    Performs the single minimization objective particle swarm optimization for the Schwefel function on a structure-of-arrays swarm.
+    With the same seed (for the random module, or the seed argument of both) this gives the same swarm and stats as singleObj, without the plots or printing.
+
+    :param smin: The minimum speed for a particle.
+    :param smax: The maximum speed for a particle.
+    :param pmin: The minimum position for a particle.
+    :param pmax: The maximum position for a particle.
+    :param n_pop: Number of particles to have in the population
+    :param n_gen: Number of generations to iterate (number of times particles move)
+    :param bestPerGen: Bool for if the best particle should be reset each generation
+    :param size: The number of dimensions for the particles.
+    :param evaluate: Function taking the (n_pop, dim) positions and returning the (n_pop,) fitness, or the name of a registered VectorBenchmarks objective. Defaults to the vectorized Schwefel function.
+    :param observers: The Observers.Observer objects called during the run, for example Observers.PlotObserver(SingleFunctions.graphsingle).
+    :param checkpointPath: The file the state of the run is saved to every checkpointInterval generations. None turns checkpointing off.
+    :param checkpointInterval: The number of generations between checkpoints.
+    :param resume: Bool for if the run should continue from the checkpoint file if it exists. Gives the same results as a run that was never stopped.
+    :param instrument: A Profiling.Instrumentation adding the time of each phase, the allocations and garbage collections of each generation to the logbook.
+    :param recordInterval: The stats are only recorded every recordInterval generations (and for the first and last ones).
+    :param logPath: The CSV file the logbook rows are streamed to instead of keeping the whole logbook in memory. None keeps it in memory.
+    :param stop: A Termination.StopCriteria to end the run early, its reason says why the run stopped. None always runs n_gen generations.
+    :param phi1: The maximum weight a particle's best position should have on the updated speed
+    :param phi2: The maximum weight the swarm's best position should have on the updated speed
+    :param topology: A Topologies topology or its name ("ring", "vonneumann", "random", "knn") each particle's leader comes from. None is the global best topology.
+    :param seed: The seed of the run's own random number stream (an int, numpy SeedSequence or Generator, see RandomStreams). None draws from the random module.
+    :param kernel: A VelocityKernels kernel (or its name: "linear", "constriction", "adaptive") the speeds are updated with. None adds the pulls onto the speeds.
+    :return: Returns the final swarm and the logbook of the run.
+    '''
+
+    if evaluate is None:
+        evaluate = VectorBenchmarks.schwefel
+    elif isinstance(evaluate, str):
+        evaluate = VectorBenchmarks.getObjective(evaluate)
+
+    rng = RandomStreams.makeRng(seed)
+    topology = Topologies.getTopology(topology)
+    logbook = None
+    startGen = 0
+    if resume and checkpointPath is not None and os.path.exists(checkpointPath):
+        arrays, generation, logbook = Checkpoint.loadCheckpoint(checkpointPath, rng)
+        swarm = Swarm.fromArrays(arrays)
+        if topology is not None:
+            topology.setState(arrays)
+        startGen = generation + 1
+    else:
+        swarm = generateSwarm(n_pop, size, pmin, pmax, smin, smax, rng=rng)
+    logbook = runSwarm(swarm, evaluate, n_gen, bestPerGen, phi1, phi2, observers=observers, logbook=logbook, startGen=startGen,
+                       checkpointPath=checkpointPath, checkpointInterval=checkpointInterval, instrument=instrument,
+                       recordInterval=recordInterval, logPath=logPath, stop=stop, topology=topology, rng=rng, kernel=kernel)
+    return swarm, logbook
@@ -0,0 +1,324 @@
+import concurrent.futures
+import csv
+import itertools
+import json
+import os
+import time
+import warnings
+import numpy
+from multiprocessing import shared_memory
+import MultiFunctions
+import SingleFunctions
+import SwarmEngine
+import VectorBenchmarks
+import VelocityKernels
+
+# Hyperparameter sweeps: many runs over a design of settings and seeds, spread over a process pool.
+# Each finished run is added to one results CSV right away, so a sweep that is stopped can be started again and only runs what is missing.
+# Arrays the objective needs (lookup tables, measured data, ...) are put in shared memory once and every worker reads them from there with sharedArray.
+
+DEFAULTS = {"smin": -1.0, "smax": 1.0, "pmin": -500.0, "pmax": 500.0, "n_pop": 50, "n_gen": 100, "bestPerGen": False, "phi1": 2.0, "phi2": 2.0, "kernel": None}
+RUNNERS = ("single", "multi", "vectorized")
+# The settings of each runner when the design doesn't give them, the limits are the ones of singleObj/multiObj in the notebook
+RUNNER_DEFAULTS = {"single": DEFAULTS, "multi": {**DEFAULTS, "smin": -0.5, "smax": 0.5, "pmin": -5.0, "pmax": 5.0}, "vectorized": DEFAULTS}
+
+_shared = {} # The shared arrays of this process, by name
+
+
+def gridDesign(space):
+    '''
+    :param space: Dict of the settings to sweep, each with the list of its values.
+    :return: Returns the list of settings dicts, one for every combination of the values.
+    '''
+
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def _scale(values, fraction):
+    '''
+    :param values: A (low, high) tuple for a range, ints for a range of ints, or a list of the values to pick from.
+    :param fraction: Where in the values to pick, from 0 up to 1.
+    :return: Returns the picked value.
+    '''
+
+    if isinstance(values, tuple):
+        low, high = values
+        if isinstance(low, int) and isinstance(high, int):
+            return min(low + int(fraction * (high - low + 1)), high)
+        return float(low + fraction * (high - low))
+    values = list(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def randomDesign(space, n, seed=0):
+    '''
+    :param space: Dict of the settings to sweep. A (low, high) tuple is a range the values are drawn from, a list is the values to pick from.
+    :param n: The number of settings to draw.
+    :param seed: The seed of the draws.
+    :return: Returns the list of n settings dicts drawn at random.
+    '''
+
+    rng = numpy.random.default_rng(seed)
+    design = [{} for _ in range(n)]
+    for name, values in space.items():
+        for settings, fraction in zip(design, rng.random(n)):
+            settings[name] = _scale(values, fraction)
+    return design
+
+
+def latinHypercube(space, n, seed=0):
+    '''
+    Draws settings so that every setting's range is cut into n equal parts and each part is used exactly once, which covers the space better than randomDesign for the same n.
+
+    :param space: Dict of the settings to sweep. A (low, high) tuple is a range, a list is the values to pick from.
+    :param n: The number of settings to draw.
+    :param seed: The seed of the draws.
+    :return: Returns the list of n settings dicts.
+    '''
+
+    rng = numpy.random.default_rng(seed)
+    design = [{} for _ in range(n)]
+    for name, values in space.items():
+        fractions = (rng.permutation(n) + rng.random(n)) / n
+        for settings, fraction in zip(design, fractions):
+            settings[name] = _scale(values, fraction)
+    return design
+
+
+def sharedArray(name):
+    '''
+    :param name: The name the array was given in the data of runSweep.
+    :return: Returns the read-only array, from the shared memory when called in a worker.
+    '''
+
+    return _shared[name][1]
+
+
+def _attach(specs):
+    '''
+    Runs when a worker starts, finding the shared arrays.
+
+    :param specs: Dict of (shared memory name, shape, dtype) for each array's name.
+    '''
+
+    for name, (block, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=block)
+        array = numpy.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array.flags.writeable = False
+        _shared[name] = (shm, array) # The block has to be kept open as long as the array is used
+
+
+def objectiveName(runner, objective=None):
+    '''
+    :param runner: "single", "multi" or "vectorized".
+    :param objective: The objective of the single and vectorized runners, a VectorBenchmarks name, a function or None for the Schwefel function.
+    :return: Returns the name of the objective the runs optimize, as written in the results CSV.
+    '''
+
+    if runner == "multi":
+        return "himmelblau+rastrigin"
+    if objective is None:
+        return "schwefel"
+    if isinstance(objective, str):
+        return objective
+    return "%s.%s" % (getattr(objective, "__module__", None), getattr(objective, "__qualname__", type(objective).__name__))
+
+
+def _settings(runner, settings):
+    '''
+    :param runner: "single", "multi" or "vectorized".
+    :param settings: Dict of settings from a design.
+    :return: Returns all the settings of the run: the runner's RUNNER_DEFAULTS with the design's settings on top, and 2 dimensions when the vectorized runner isn't given its size.
+    '''
+
+    c = {**RUNNER_DEFAULTS.get(runner, DEFAULTS), **settings}
+    if runner == "vectorized":
+        c.setdefault("size", 2)
+    return c
+
+
+def _key(runner, objective, settings, seed):
+    # From all the settings, so designs spelling out a default or leaving it out give the same run the same key
+    return json.dumps({**_settings(runner, settings), "runner": runner, "objective": objective, "seed": seed}, sort_keys=True)
+
+
+def runConfig(runner, settings, seed, objective=None, stop=None):
+    '''
+    Does one run of a sweep.
+
+    :param runner: "single" for SingleFunctions.runSingleObj, "multi" for MultiFunctions.runMultiObj or "vectorized" for SwarmEngine.singleObjVectorized.
+    :param settings: Dict of the run's settings, the runner's RUNNER_DEFAULTS are used for the missing ones. The "kernel" is the name of a VelocityKernels kernel, None for the original update. The vectorized runner also takes the number of dimensions as "size".
+    :param seed: The seed of the run's own random number stream (see RandomStreams), so the run gives the same results in whichever worker it is done.
+    :param objective: The objective of the single and vectorized runners, a VectorBenchmarks name or a function taking the (n_pop, dim) positions. None is the Schwefel function.
+    :param stop: A Termination.StopCriteria to end the runs early.
+    :return: Returns the results row: the runner, the objective's name, the settings, the seed, the best fitness found for each objective, the number of generations and evaluations, why it stopped and the time taken.
+    '''
+
+    c = _settings(runner, settings)
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore") # creator.create warns when the classes already exist
+        if runner == "single":
+            logbook = SingleFunctions.runSingleObj(c["smin"], c["smax"], c["pmin"], c["pmax"], c["n_pop"], c["n_gen"], c["bestPerGen"],
+                                                   stop=stop, phi1=c["phi1"], phi2=c["phi2"], seed=seed, kernel=c["kernel"], objective=objective)[2]
+            bests = {"best": min(logbook.select("min"))}
+        elif runner == "multi":
+            logbook = MultiFunctions.runMultiObj(c["smin"], c["smax"], c["pmin"], c["pmax"], c["n_pop"], c["n_gen"], c["bestPerGen"],
+                                                 stop=stop, phi1=c["phi1"], phi2=c["phi2"], seed=seed, kernel=c["kernel"])[2]
+            bests = {"best1": min(logbook.select("min1")), "best2": min(logbook.select("min2"))}
+        elif runner == "vectorized":
+            logbook = SwarmEngine.singleObjVectorized(c["smin"], c["smax"], c["pmin"], c["pmax"], c["n_pop"], c["n_gen"], c["bestPerGen"],
+                                                      size=c["size"], evaluate=objective, stop=stop, phi1=c["phi1"], phi2=c["phi2"], seed=seed, kernel=c["kernel"])[1]
+            bests = {"best": min(logbook.select("min"))}
+        else:
+            raise ValueError("Unknown runner %r, expected one of %s" % (runner, ", ".join(RUNNERS)))
+
+    generations = logbook[-1]["gen"] + 1 if logbook else 0
+    name = objectiveName(runner, objective)
+    return {"runner": runner, "objective": name, **c, "seed": seed, **{column: float(value) for column, value in bests.items()}, "generations": generations,
+            "evals": generations * c["n_pop"], "reason": stop.reason if stop is not None else None,
+            "seconds": time.perf_counter() - start, "key": _key(runner, name, settings, seed)}
+
+
+def _parse(value):
+    '''
+    :param value: A value read from the results CSV.
+    :return: Returns the value as the int, float, bool or None it was written as.
+    '''
+
+    if value in ("", "None"):
+        return None
+    if value in ("True", "False"):
+        return value == "True"
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return value
+
+
+def readResults(path):
+    '''
+    :param path: The results CSV of a sweep.
+    :return: Returns the list of results rows, an empty list if the file doesn't exist.
+    '''
+
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="") as file:
+        return [{name: value if name == "key" else _parse(value) for name, value in row.items()} for row in csv.DictReader(file)]
+
+
+def runSweep(design, seeds=5, runner="vectorized", objective=None, path=None, workers=None, data=None, stop=None):
+    '''
+    Runs every settings of a design with every seed, on a process pool.
+
+    :param design: The list of settings dicts (see gridDesign, randomDesign and latinHypercube). The settings not in it are the runner's RUNNER_DEFAULTS.
+    :param seeds: The number of seeds (0, 1, ...) or the list of seeds each settings is run with.
+    :param runner: "single", "multi" or "vectorized", see runConfig.
+    :param objective: The objective of the single and vectorized runners, a VectorBenchmarks name or a function taking the (n_pop, dim) positions that can be pickled. None is the Schwefel function.
+                      The multi runner always optimizes the Himmelblau and Rastrigin functions and refuses one.
+    :param path: The results CSV. Runs already in it (same runner, objective, settings and seed) are skipped, new ones are added as they finish.
+                 A file written by a sweep with other columns is refused. None keeps the results in memory only.
+    :param workers: The number of worker processes, None for one per CPU. 1 runs everything in this process.
+    :param data: Dict of the arrays the objective reads with sharedArray, put in shared memory once for all the workers.
+    :param stop: A Termination.StopCriteria to end each run early.
+    :return: Returns the list of results rows of the whole sweep, including the ones from earlier sessions.
+    '''
+
+    if runner not in RUNNERS:
+        raise ValueError("Unknown runner %r, expected one of %s" % (runner, ", ".join(RUNNERS)))
+    for settings in design:
+        unknown = set(settings) - set(DEFAULTS) - ({"size"} if runner == "vectorized" else set())
+        if unknown:
+            raise ValueError("Unknown settings %s for the %s runner" % (", ".join(sorted(unknown)), runner))
+        c = _settings(runner, settings)
+        if c["kernel"] is not None:
+            VelocityKernels.getKernel(c["kernel"]).start(c["phi1"], c["phi2"], c["n_gen"]) # A kernel that can't use these settings (constriction with phi1 + phi2 <= 4) fails before any run
+    if runner == "multi" and objective is not None:
+        raise ValueError("The multi runner always optimizes the Himmelblau and Rastrigin functions, it doesn't take an objective")
+    if isinstance(objective, str):
+        VectorBenchmarks.getObjective(objective) # Fails now instead of in every worker
+    seeds = list(range(seeds)) if isinstance(seeds, int) else list(seeds)
+
+    fields = ["runner", "objective"] + list(DEFAULTS) + (["size"] if runner == "vectorized" else []) + ["seed"] + \
+             (["best1", "best2"] if runner == "multi" else ["best"]) + ["generations", "evals", "reason", "seconds", "key"]
+    header = None
+    if path is not None and os.path.exists(path):
+        with open(path, newline="") as file:
+            header = next(csv.reader(file), None)
+        if header is not None and header != fields:
+            raise ValueError("%s holds the results of a different sweep (columns %s, expected %s)" % (path, ", ".join(header), ", ".join(fields)))
+
+    name = objectiveName(runner, objective)
+    results = readResults(path) if path is not None else []
+    done = {row["key"] for row in results}
+    todo = [(settings, seed) for settings in design for seed in seeds if _key(runner, name, settings, seed) not in done]
+    if not todo:
+        return results
+
+    file = None
+    if path is not None:
+        file = open(path, "a", newline="", buffering=1)
+        writer = csv.DictWriter(file, fields, restval="", extrasaction="ignore")
+        if header is None:
+            writer.writeheader()
+
+    # The shared arrays are made once here, the workers attach to them when they start
+    blocks = []
+    specs = {}
+    try:
+        for name, array in (data or {}).items():
+            array = numpy.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            blocks.append(shm)
+            numpy.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            specs[name] = (shm.name, array.shape, array.dtype.str)
+
+        def finished(row):
+            results.append(row)
+            if file is not None:
+                writer.writerow(row)
+
+        if workers == 1:
+            _attach(specs)
+            for settings, seed in todo:
+                finished(runConfig(runner, settings, seed, objective, stop))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(workers, initializer=_attach, initargs=(specs,)) as executor:
+                futures = [executor.submit(runConfig, runner, settings, seed, objective, stop) for settings, seed in todo]
+                for future in concurrent.futures.as_completed(futures):
+                    finished(future.result())
+    finally:
+        if file is not None:
+            file.close()
+        for name in specs:
+            _shared.pop(name, None)
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return results
+
+
+def aggregate(results, metric="best"):
+    '''
+    Summarizes the results of a sweep over the seeds of each settings.
+
+    :param results: The results rows of runSweep or readResults.
+    :param metric: The column summarized, for example "best", "best1" or "generations".
+    :return: Returns one row per settings with the number of runs and the mean, std, min and max of the metric, sorted by the mean.
+    '''
+
+    groups = {}
+    for row in results:
+        settings = {name: value for name, value in row.items() if name in DEFAULTS or name in ("runner", "objective", "size")}
+        groups.setdefault(json.dumps(settings, sort_keys=True), (settings, []))[1].append(row[metric])
+    table = []
+    for settings, values in groups.values():
+        values = numpy.array(values, dtype=float)
+        table.append({**settings, "runs": len(values), metric + "_mean": float(values.mean()), metric + "_std": float(values.std()),
+                      metric + "_min": float(values.min()), metric + "_max": float(values.max())})
+    table.sort(key=lambda row: row[metric + "_mean"])
+    return table
@@ -0,0 +1,117 @@
+import time
+import numpy
+
+# Stopping criteria so a run does not keep going after it has converged. They are checked at the end of every generation and only cost a few
+# reductions over the positions (or speeds) arrays, the ones that need them are skipped when they are not asked for.
+
+REASONS = ("target", "stagnation", "diversity", "speed", "time", "evals")
+
+
+def diversity(positions):
+    '''
+    :param positions: The (n_pop, dim) positions of the swarm.
+    :return: Returns the root mean square distance of the particles to the swarm's centroid. It goes to 0 when the swarm collapses onto one point.
+    '''
+
+    return float(numpy.sqrt(numpy.var(positions, axis=0).sum()))
+
+
+def speedNorm(speeds):
+    '''
+    :param speeds: The (n_pop, dim) speeds of the swarm.
+    :return: Returns the root mean square length of the particles' speeds.
+    '''
+
+    return float(numpy.sqrt(numpy.einsum("ij,ij->", speeds, speeds) / len(speeds)))
+
+
+class StopCriteria:
+    '''
+    The stopping criteria of a run. Every criterion is off unless it is given, the run stops as soon as one of them is met.
+    After the run, reason is the name of the criterion that stopped it (one of REASONS, None if it ran all its generations) and generation the last generation it ran.
+    '''
+
+    def __init__(self, target=None, stagnation=None, tolerance=0.0, minDiversity=None, minSpeed=None, maxTime=None, maxEvals=None):
+        '''
+        :param target: The best fitness to reach, one value or one for each objective. The run stops when every objective's best is at or below it.
+        :param stagnation: The number of generations the best fitness can go without improving before the run stops.
+        :param tolerance: How much the best fitness has to improve by for it to count for the stagnation.
+        :param minDiversity: The run stops when the root mean square distance of the particles to their centroid is below this.
+        :param minSpeed: The run stops when the root mean square speed of the particles is below this.
+        :param maxTime: The wall-clock seconds the run can take.
+        :param maxEvals: The number of evaluations the run can do.
+        '''
+
+        self.target = None if target is None else numpy.atleast_1d(numpy.asarray(target, dtype=float))
+        self.stagnation = stagnation
+        self.tolerance = tolerance
+        self.minDiversity = minDiversity
+        self.minSpeed = minSpeed
+        self.maxTime = maxTime
+        self.maxEvals = maxEvals
+        self.start()
+
+    @property
+    def needsPositions(self):
+        '''
+        :return: Returns True if check needs the positions of the particles.
+        '''
+
+        return self.minDiversity is not None
+
+    @property
+    def needsSpeeds(self):
+        '''
+        :return: Returns True if check needs the speeds of the particles.
+        '''
+
+        return self.minSpeed is not None
+
+    def start(self):
+        '''
+        Resets the criteria at the start of a run.
+        '''
+
+        self.reason = None
+        self.generation = None
+        self._startTime = time.perf_counter()
+        self._reference = None # The best fitness the stagnation is measured from
+        self._stale = 0
+
+    def check(self, generation, evals, best, positions=None, speeds=None):
+        '''
+        Checks the criteria at the end of a generation.
+
+        :param generation: The generation that was just completed.
+        :param evals: The total number of evaluations done so far.
+        :param best: The best fitness found, one value or one for each objective.
+        :param positions: The (n_pop, dim) positions of the particles. Only needed for minDiversity.
+        :param speeds: The (n_pop, dim) speeds of the particles. Only needed for minSpeed.
+        :return: Returns the name of the criterion that is met, or None to keep going.
+        '''
+
+        best = numpy.atleast_1d(numpy.asarray(best, dtype=float))
+        reason = None
+        if self.stagnation is not None:
+            if self._reference is None or numpy.any(best < self._reference - self.tolerance):
+                self._reference = best.copy()
+                self._stale = 0
+            else:
+                self._stale += 1
+
+        if self.target is not None and numpy.all(best <= self.target):
+            reason = "target"
+        elif self.stagnation is not None and self._stale >= self.stagnation:
+            reason = "stagnation"
+        elif self.minDiversity is not None and diversity(positions) < self.minDiversity:
+            reason = "diversity"
+        elif self.minSpeed is not None and speedNorm(speeds) < self.minSpeed:
+            reason = "speed"
+        elif self.maxTime is not None and time.perf_counter() - self._startTime >= self.maxTime:
+            reason = "time"
+        elif self.maxEvals is not None and evals >= self.maxEvals:
+            reason = "evals"
+
+        self.generation = generation
+        self.reason = reason
+        return reason
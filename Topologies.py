@@ -0,0 +1,337 @@
+import math
+import numpy
+import SwarmEngine
+
+# Neighborhood (lbest) topologies: instead of every particle following the best particle of the whole swarm, each particle follows the best of its own neighborhood.
+# A neighborhood is a row of particle indexes (the particle itself included), so every topology gives an (n_pop, m) index array and the leaders of all the particles
+# are found with one fancy-indexed argmin. Ring and von Neumann neighborhoods are index arithmetic, the k nearest neighbors use a KD-tree when scipy is installed
+# and a grid of cells otherwise, so the cost stays close to linear in the swarm size instead of comparing every pair of particles.
+
+
+def _kdTree():
+    '''
+    :return: Returns scipy's cKDTree class, None if scipy is not installed.
+    '''
+
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        return None
+    return cKDTree
+
+
+def localBest(bestFitness, neighborhoods):
+    '''
+    :param bestFitness: The (n_pop,) best fitness of each particle.
+    :param neighborhoods: The (n_pop, m) indexes of each particle's neighborhood.
+    :return: Returns the (n_pop,) index of the particle with the best fitness in each neighborhood. Ties go to the first one in the neighborhood.
+    '''
+
+    return neighborhoods[numpy.arange(len(neighborhoods)), numpy.argmin(bestFitness[neighborhoods], axis=1)]
+
+
+class Topology:
+    '''
+    Base class of the topologies. A topology only has to give the neighborhoods, the leaders are found from them the same way for all of them.
+    '''
+
+    def neighborhoods(self, positions, improved=True, rng=None):
+        '''
+        :param positions: The (n_pop, dim) positions of the particles.
+        :param improved: Bool for if the swarm's best improved in the last generation.
+        :param rng: The run's numpy Generator, for the topologies that draw random numbers. None uses the random module.
+        :return: Returns the (n_pop, m) indexes of each particle's neighborhood.
+        '''
+
+        raise NotImplementedError
+
+    def state(self):
+        '''
+        :return: Returns the dict of arrays a resumed run needs to carry on with the same neighborhoods, saved in the checkpoints. Empty for the topologies that don't draw random numbers.
+        '''
+
+        return {}
+
+    def setState(self, arrays):
+        '''
+        Puts the topology back in the state it was in when a checkpoint was written.
+
+        :param arrays: The dict of arrays of the checkpoint, with the ones from state among them.
+        '''
+
+    def leaders(self, positions, bestPositions, bestFitness, improved=True, rng=None):
+        '''
+        Finds the position each particle is pulled towards, for every objective.
+
+        :param positions: The (n_pop, dim) current positions of the particles.
+        :param bestPositions: The (n_obj, n_pop, dim) best positions of the particles.
+        :param bestFitness: The (n_obj, n_pop) fitness of the best positions.
+        :param improved: Bool for if the swarm's best improved in the last generation.
+        :param rng: The run's numpy Generator (see RandomStreams). None uses the random module.
+        :return: Returns the (n_obj, n_pop, dim) leaders.
+        '''
+
+        neighborhoods = self.neighborhoods(positions, improved, rng)
+        return numpy.stack([bestPositions[k][localBest(bestFitness[k], neighborhoods)] for k in range(len(bestFitness))])
+
+
+class Ring(Topology):
+    '''
+    Each particle's neighborhood is itself and the k particles before and after it in the population, wrapping around at the ends.
+    '''
+
+    def __init__(self, k=1):
+        '''
+        :param k: The number of neighbors on each side.
+        '''
+
+        self.k = k
+        self._neighborhoods = None
+
+    def neighborhoods(self, positions, improved=True, rng=None):
+        '''
+        :param positions: The (n_pop, dim) positions of the particles.
+        :param improved: Bool for if the swarm's best improved in the last generation. Not used by this topology.
+        :param rng: Not used by this topology.
+        :return: Returns the (n_pop, 2k+1) indexes of each particle's neighborhood.
+        '''
+
+        n = len(positions)
+        if self._neighborhoods is None or len(self._neighborhoods) != n:
+            offsets = numpy.arange(-self.k, self.k + 1)
+            self._neighborhoods = (numpy.arange(n)[:, numpy.newaxis] + offsets) % n
+        return self._neighborhoods
+
+
+class VonNeumann(Topology):
+    '''
+    The particles are laid out on a grid wrapping around at the edges, each particle's neighborhood is itself and the particles above, below, left and right of it.
+    '''
+
+    def __init__(self, columns=None):
+        '''
+        :param columns: The number of columns of the grid. None makes it as square as possible.
+        '''
+
+        self.columns = columns
+        self._neighborhoods = None
+
+    def neighborhoods(self, positions, improved=True, rng=None):
+        '''
+        :param positions: The (n_pop, dim) positions of the particles.
+        :param improved: Bool for if the swarm's best improved in the last generation. Not used by this topology.
+        :param rng: Not used by this topology.
+        :return: Returns the (n_pop, 5) indexes of each particle's neighborhood.
+        '''
+
+        n = len(positions)
+        if self._neighborhoods is None or len(self._neighborhoods) != n:
+            columns = self.columns or max(1, int(round(math.sqrt(n))))
+            offsets = numpy.array([0, -1, 1, -columns, columns])
+            self._neighborhoods = (numpy.arange(n)[:, numpy.newaxis] + offsets) % n
+        return self._neighborhoods
+
+
+class RandomK(Topology):
+    '''
+    Each particle is informed by itself and k particles picked at random. The links are picked again after every generation in which the swarm's best did not improve, like in SPSO 2007.
+    The random numbers come from the run's Generator, or the random module when there is none (through SwarmEngine.uniformBlock), so runs stay reproducible from their seed.
+    '''
+
+    def __init__(self, k=3):
+        '''
+        :param k: The number of random informants of each particle.
+        '''
+
+        self.k = k
+        self._neighborhoods = None
+
+    def neighborhoods(self, positions, improved=True, rng=None):
+        '''
+        :param positions: The (n_pop, dim) positions of the particles.
+        :param improved: Bool for if the swarm's best improved in the last generation. The links are picked again when it didn't.
+        :param rng: The run's numpy Generator the links are drawn from. None uses the random module.
+        :return: Returns the (n_pop, k+1) indexes of each particle's neighborhood.
+        '''
+
+        n = len(positions)
+        if self._neighborhoods is None or len(self._neighborhoods) != n or not improved:
+            informants = numpy.minimum((SwarmEngine.uniformBlock((n, self.k), rng) * n).astype(int), n - 1)
+            self._neighborhoods = numpy.column_stack((numpy.arange(n), informants))
+        return self._neighborhoods
+
+    def state(self):
+        '''
+        :return: Returns the current links, they are only picked again when the swarm's best doesn't improve so a resumed run has to start from them.
+        '''
+
+        return {} if self._neighborhoods is None else {"topology_neighborhoods": self._neighborhoods}
+
+    def setState(self, arrays):
+        '''
+        :param arrays: The dict of arrays of the checkpoint.
+        '''
+
+        if "topology_neighborhoods" in arrays:
+            self._neighborhoods = numpy.array(arrays["topology_neighborhoods"], dtype=int)
+
+
+class NearestNeighbors(Topology):
+    '''
+    Each particle's neighborhood is itself and the k particles closest to its current position, found again every generation.
+    '''
+
+    def __init__(self, k=3):
+        '''
+        :param k: The number of nearest neighbors.
+        '''
+
+        self.k = k
+
+    def neighborhoods(self, positions, improved=True, rng=None):
+        '''
+        :param positions: The (n_pop, dim) positions of the particles.
+        :param improved: Bool for if the swarm's best improved in the last generation. Not used by this topology.
+        :param rng: Not used by this topology.
+        :return: Returns the (n_pop, k+1) indexes of each particle's neighborhood.
+        '''
+
+        return nearestNeighbors(positions, self.k)
+
+
+TOPOLOGIES = {"ring": Ring, "vonneumann": VonNeumann, "random": RandomK, "knn": NearestNeighbors}
+
+
+def getTopology(topology):
+    '''
+    :param topology: A topology object, or the name of one in TOPOLOGIES made with its default settings.
+    :return: Returns the topology object.
+    '''
+
+    if isinstance(topology, str):
+        try:
+            return TOPOLOGIES[topology]()
+        except KeyError:
+            raise KeyError("Unknown topology %r, the known ones are: %s" % (topology, ", ".join(sorted(TOPOLOGIES)))) from None
+    return topology
+
+
+BLOCK = 1 << 22 # Most coordinate differences _gridNeighbors works out at once
+
+
+def nearestNeighbors(points, k):
+    '''
+    Finds the k nearest neighbors of every point.
+
+    :param points: The (n, dim) points.
+    :param k: The number of neighbors. Capped to n - 1.
+    :return: Returns the (n, k+1) indexes of each point and its k nearest neighbors, the point itself first.
+             Without scipy the neighbors are only exact for up to 3 dimensions, see _gridNeighbors.
+    '''
+
+    points = numpy.asarray(points, dtype=float)
+    k = min(k, len(points) - 1)
+    tree = _kdTree()
+    if tree is not None:
+        neighbors = tree(points).query(points, k + 1)[1].reshape(len(points), k + 1)
+    else:
+        neighbors = _gridNeighbors(points, k)
+
+    # Each point comes first in its own neighborhood like in the other topologies, copies of it at the same position could be ahead of it
+    rows = numpy.arange(len(points))
+    at = numpy.argmax(neighbors == rows[:, numpy.newaxis], axis=1)
+    neighbors[rows, at] = neighbors[:, 0]
+    neighbors[:, 0] = rows
+    return neighbors
+
+
+def _gridNeighbors(points, k):
+    '''
+    K nearest neighbors with a grid of cells over the (up to) three widest dimensions, for when scipy is not installed.
+    The cell edges are quantiles of the points on each axis, so the cells follow the swarm as it converges instead of all its points ending up in one cell.
+    The points of each cell are compared with the points of the cells around it. When a neighbor could still be outside the searched cells, the search grows by one ring of cells for those points.
+    The distances are worked out from the differences of the points, for at most BLOCK values at a time, so the memory stays bounded however many points share a cell.
+    (Expanding |a - b|^2 into |a|^2 + |b|^2 - 2ab would be faster but cancels out when the points are close together far from the origin, like a converged swarm.)
+    Points with more than k copies at the same position (particles piled up at pmin/pmax) take their neighbors among their copies directly.
+    With more than 3 dimensions the distance on the grid's dimensions says little about the real distance and growing the search would end up comparing almost every pair,
+    so the neighbors are taken from the first cells around each point that hold enough of them. They are close, but not always the exact nearest ones.
+
+    :param points: The (n, dim) points.
+    :param k: The number of neighbors, at most n - 1.
+    :return: Returns the (n, k+1) indexes of each point and its k nearest neighbors.
+    '''
+
+    n, dim = points.shape
+    result = numpy.empty((n, k + 1), dtype=int)
+
+    # Groups of more than k copies: each copy is followed by the next k copies of its group, all at distance 0
+    copies, counts = numpy.unique(points, axis=0, return_inverse=True, return_counts=True)[1:]
+    copies = copies.reshape(-1)
+    piled = counts[copies] > k
+    if piled.any():
+        members = numpy.flatnonzero(piled)
+        members = members[numpy.argsort(copies[members], kind="stable")]
+        group = copies[members]
+        first = numpy.searchsorted(group, group)
+        rank = numpy.arange(len(members)) - first
+        size = counts[group]
+        result[members] = members[first[:, numpy.newaxis] + (rank[:, numpy.newaxis] + numpy.arange(k + 1)) % size[:, numpy.newaxis]]
+
+    g = min(dim, 3)
+    exact = dim <= 3
+    axes = numpy.argsort(points.max(axis=0) - points.min(axis=0), kind="stable")[::-1][:g]
+    projected = points[:, axes]
+    m = max(1, int((n / (8 * (k + 1))) ** (1.0 / g))) # Cells per axis, fewer when the quantiles repeat
+    edges = [numpy.unique(numpy.quantile(projected[:, a], numpy.linspace(0.0, 1.0, m + 1))) for a in range(g)]
+    shape = tuple(max(len(e) - 1, 1) for e in edges)
+    cells = numpy.column_stack([numpy.clip(numpy.searchsorted(e, projected[:, a], side="right") - 1, 0, shape[a] - 1) for a, e in enumerate(edges)])
+    flat = numpy.ravel_multi_index(cells.T, shape)
+    order = numpy.argsort(flat, kind="stable")
+    sortedFlat = flat[order]
+    count = int(numpy.prod(shape))
+    starts = numpy.searchsorted(sortedFlat, numpy.arange(count))
+    ends = numpy.searchsorted(sortedFlat, numpy.arange(count), side="right")
+    top = numpy.array(shape) - 1
+
+    for cell in numpy.unique(sortedFlat):
+        pending = order[starts[cell]:ends[cell]]
+        pending = pending[~piled[pending]]
+        coord = numpy.array(numpy.unravel_index(cell, shape))
+        r = 1
+        while len(pending):
+            lo = numpy.maximum(coord - r, 0)
+            hi = numpy.minimum(coord + r, top)
+
+            # The cells of the block are contiguous along the last axis, so each row of the block is one slice of the sorted points
+            if g == 1:
+                rows = numpy.zeros((1, 0), dtype=int)
+            else:
+                rows = numpy.stack(numpy.meshgrid(*(numpy.arange(a, b + 1) for a, b in zip(lo[:-1], hi[:-1])), indexing="ij"), axis=-1).reshape(-1, g - 1)
+            first = numpy.ravel_multi_index(numpy.column_stack((rows, numpy.full(len(rows), lo[-1]))).T, shape)
+            last = numpy.ravel_multi_index(numpy.column_stack((rows, numpy.full(len(rows), hi[-1]))).T, shape)
+            candidates = numpy.concatenate([order[starts[a]:ends[b]] for a, b in zip(first, last)])
+
+            full = numpy.all(lo == 0) and numpy.all(hi == top)
+            if len(candidates) <= k and not full:
+                r += 1
+                continue
+
+            # Distance from the edges of the searched cells along each grid axis, nothing outside them can be closer
+            lower = numpy.array([edges[a][lo[a]] if lo[a] > 0 else -numpy.inf for a in range(g)])
+            upper = numpy.array([edges[a][hi[a] + 1] if hi[a] < top[a] else numpy.inf for a in range(g)])
+            left = []
+            step = max(1, BLOCK // (len(candidates) * dim))
+            others = points[candidates]
+            for chunk in range(0, len(pending), step):
+                batch = pending[chunk:chunk + step]
+                distances = ((points[batch, numpy.newaxis, :] - others) ** 2).sum(axis=2)
+                nearest = numpy.argpartition(distances, k, axis=1)[:, :k + 1]
+                kth = numpy.take_along_axis(distances, nearest, axis=1).max(axis=1)
+                near = projected[batch]
+                bound = numpy.minimum(near - lower, upper - near).min(axis=1)
+                done = full | (kth <= bound ** 2) | (not exact)
+                result[batch[done]] = candidates[nearest[done]]
+                left.append(batch[~done])
+            pending = numpy.concatenate(left)
+            r += 1
+    return result
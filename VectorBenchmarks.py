@@ -0,0 +1,157 @@
+import functools
+import numpy
+
+# Array-in/array-out versions of the deap.benchmarks functions used by the swarms.
+# Each function scores a whole (n, dim) population in one call and returns the (n,) errors.
+# The sums over the dimensions are done in the same order as deap so the numbers match deap's exactly.
+
+
+def _asPopulation(positions):
+    '''
+    Makes sure the positions are a 2D float array with one particle per row.
+
+    :param positions: Array-like of shape (n, dim), or (dim,) for a single particle
+    :return: Returns the (n, dim) float array.
+    '''
+
+    positions = numpy.asarray(positions, dtype=float)
+    if positions.ndim == 1:
+        positions = positions[numpy.newaxis, :]
+    return positions
+
+
+def _sumDims(terms):
+    '''
+    Sums the per-dimension terms of each particle one dimension at a time, the same order as Python's sum.
+
+    :param terms: The (n, dim) array of terms
+    :return: Returns the (n,) sums.
+    '''
+
+    if terms.shape[1] == 0:
+        return numpy.zeros(terms.shape[0])
+    return numpy.cumsum(terms, axis=1)[:, -1]
+
+
+def schwefel(positions):
+    '''
+    Calculates the error between the Schwefel function and every particle
+
+    :param positions: The (n, dim) positions of the particles being examined
+    :return: Returns the (n,) errors between the particles and the Schwefel function
+    '''
+
+    x = _asPopulation(positions)
+    return 418.9828872724339 * x.shape[1] - _sumDims(x * numpy.sin(numpy.sqrt(numpy.abs(x))))
+
+
+def himmelblau(positions):
+    '''
+    Calculates the error between the Himmelblau function and every particle. Only the first two dimensions are used.
+
+    :param positions: The (n, dim) positions of the particles being examined
+    :return: Returns the (n,) errors between the particles and the Himmelblau function
+    '''
+
+    x = _asPopulation(positions)
+    x0 = x[:, 0]
+    x1 = x[:, 1]
+    # float_power squares through pow like Python's ** does, a plain x*x can be off by a rounding step from deap
+    return numpy.float_power(x0 * x0 + x1 - 11, 2) + numpy.float_power(x0 + x1 * x1 - 7, 2)
+
+
+def rastrigin(positions):
+    '''
+    Calculates the error between the Rastrigin function and every particle
+
+    :param positions: The (n, dim) positions of the particles being examined
+    :return: Returns the (n,) errors between the particles and the Rastrigin function
+    '''
+
+    x = _asPopulation(positions)
+    return 10 * x.shape[1] + _sumDims(x * x - 10 * numpy.cos(2 * numpy.pi * x))
+
+
+# The vectorized objectives that can be looked up by name. Users can add their own with registerObjective.
+OBJECTIVES = {
+    "schwefel": schwefel,
+    "himmelblau": himmelblau,
+    "rastrigin": rastrigin,
+}
+
+
+def registerObjective(name, func):
+    '''
+    Registers a vectorized objective so it can be looked up by name.
+
+    :param name: The name the objective is stored under. An existing objective with the same name is replaced.
+    :param func: Function taking the (n, dim) positions of the particles and returning their (n,) errors.
+    :return: Returns the registered function.
+    '''
+
+    if not callable(func):
+        raise TypeError("The objective registered as %r is not callable" % name)
+    OBJECTIVES[name] = func
+    return func
+
+
+def getObjective(name):
+    '''
+    Looks up a vectorized objective by name.
+
+    :param name: The name the objective was registered under.
+    :return: Returns the function that scores a (n, dim) population.
+    '''
+
+    try:
+        return OBJECTIVES[name]
+    except KeyError:
+        raise KeyError("No objective registered as %r, the registered ones are %s" % (name, sorted(OBJECTIVES))) from None
+
+
+def stackObjectives(*funcs):
+    '''
+    Combines several vectorized objectives into one multi-objective function.
+
+    :param funcs: The vectorized objectives, or the names they are registered under.
+    :return: Returns the function taking the (n, dim) positions and returning the (n, len(funcs)) errors.
+    '''
+
+    funcs = [getObjective(func) if isinstance(func, str) else func for func in funcs]
+
+    def evaluate(positions):
+        return numpy.column_stack([func(positions) for func in funcs])
+    return evaluate
+
+
+def gridValues(func, xs, ys):
+    '''
+    Evaluates a vectorized objective over every X, Y point of a grid in one call, for the heatmaps.
+
+    :param func: The vectorized objective.
+    :param xs: The X values of the grid.
+    :param ys: The Y values of the grid.
+    :return: Returns the meshgrid X, Y arrays and the Z array of the objective's values.
+    '''
+
+    X, Y = numpy.meshgrid(xs, ys)
+    Z = func(numpy.column_stack((X.ravel(), Y.ravel()))).reshape(X.shape)
+    return X, Y, Z
+
+
+@functools.lru_cache(maxsize=32)
+def cachedGrid(func, xrange, yrange):
+    '''
+    Same as gridValues for numpy.arange grids, but remembers the grids already computed so graphing the same function again is free.
+    The returned arrays are read-only since they are shared between calls.
+
+    :param func: The vectorized objective.
+    :param xrange: The (start, stop, step) of the X values of the grid.
+    :param yrange: The (start, stop, step) of the Y values of the grid.
+    :return: Returns the meshgrid X, Y arrays and the Z array of the objective's values.
+    '''
+
+    grid = gridValues(func, numpy.arange(*xrange), numpy.arange(*yrange))
+    for values in grid:
+        values.setflags(write=False)
+    return grid
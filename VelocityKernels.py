@@ -0,0 +1,157 @@
+import math
+
+# Velocity kernels: how the speed of the particles is updated from the pulls towards their best positions and their leaders.
+# Every kernel updates the whole (n_pop, dim) speeds array at once as speeds = inertia * speeds + scale * pull, where the inertia and the scale are worked out once per generation,
+# so the same kernel is used by the vectorized swarm and (through SwarmEngine.moveParticles) by the DEAP single and multi-objective runs.
+# The speeds are still limited to smin/smax afterwards.
+
+
+class VelocityKernel:
+    '''
+    Base class of the kernels. The default is the original rule of updateParticle: the pulls are added onto the current speed as they are.
+    A run calls start once, then step at every generation after the bests are updated, then velocity to update the speeds.
+    '''
+
+    def __init__(self):
+        self.inertia = 1.0
+        self.scale = 1.0
+        self.n_gen = 1
+
+    def start(self, phi1, phi2, n_gen):
+        '''
+        Resets the kernel at the start of a run.
+
+        :param phi1: The maximum weight a particle's best position has on the updated speed.
+        :param phi2: The maximum weight the leader's position has on the updated speed.
+        :param n_gen: Number of generations of the run.
+        '''
+
+        self.n_gen = n_gen
+
+    def step(self, generation, success):
+        '''
+        Works out the inertia and scale of a generation.
+
+        :param generation: The current generation.
+        :param success: The fraction of the particles whose best position improved in this generation.
+        '''
+
+    def velocity(self, speeds, pull):
+        '''
+        Updates the speeds in place.
+
+        :param speeds: The (n_pop, dim) speeds of the particles.
+        :param pull: The (n_pop, dim) pulls towards the particles' bests and leaders. It is scaled in place.
+        '''
+
+        if self.inertia != 1.0:
+            speeds *= self.inertia
+        if self.scale != 1.0:
+            pull *= self.scale
+        speeds += pull
+
+
+class LinearInertia(VelocityKernel):
+    '''
+    The speed is multiplied by an inertia weight going down in a straight line over the run (Shi and Eberhart), from exploring the space at the start to refining the best positions at the end.
+    '''
+
+    def __init__(self, start=0.9, end=0.4):
+        '''
+        :param start: The inertia weight of the first generation.
+        :param end: The inertia weight of the last generation.
+        '''
+
+        super().__init__()
+        self.first = start
+        self.last = end
+
+    def step(self, generation, success):
+        '''
+        :param generation: The current generation.
+        :param success: The fraction of the particles whose best position improved in this generation. Not used by this kernel.
+        '''
+
+        self.inertia = self.first - (self.first - self.last) * generation / max(self.n_gen - 1, 1)
+
+
+class Constriction(VelocityKernel):
+    '''
+    Clerc's constriction factor: the speed plus the pulls are multiplied by chi = 2k / |2 - phi - sqrt(phi^2 - 4 phi)| with phi = phi1 + phi2, which makes the swarm converge without needing the speed limits.
+    phi has to be above 4, the usual settings are phi1 = phi2 = 2.05 which give chi = 0.7298.
+    '''
+
+    def __init__(self, kappa=1.0):
+        '''
+        :param kappa: Between 0 and 1, lower values converge faster and explore less.
+        '''
+
+        super().__init__()
+        self.kappa = kappa
+
+    def start(self, phi1, phi2, n_gen):
+        '''
+        :param phi1: The maximum weight a particle's best position has on the updated speed.
+        :param phi2: The maximum weight the leader's position has on the updated speed.
+        :param n_gen: Number of generations of the run.
+        '''
+
+        super().start(phi1, phi2, n_gen)
+        phi = phi1 + phi2
+        if phi <= 4:
+            raise ValueError("The constriction factor needs phi1 + phi2 above 4 (for example 2.05 each), got %g" % phi)
+        chi = 2 * self.kappa / abs(2 - phi - math.sqrt(phi * phi - 4 * phi))
+        self.inertia = chi
+        self.scale = chi
+
+
+class AdaptiveInertia(VelocityKernel):
+    '''
+    The inertia weight follows the success rate of the swarm (Nickabadi et al.): the fraction of the particles whose best position improved in the last generation.
+    While many particles are improving the swarm keeps its momentum, when few are it slows down and searches around the bests.
+    '''
+
+    def __init__(self, low=0.0, high=1.0):
+        '''
+        :param low: The inertia weight when no particle improved.
+        :param high: The inertia weight when every particle improved.
+        '''
+
+        super().__init__()
+        self.low = low
+        self.high = high
+
+    def start(self, phi1, phi2, n_gen):
+        '''
+        :param phi1: The maximum weight a particle's best position has on the updated speed.
+        :param phi2: The maximum weight the leader's position has on the updated speed.
+        :param n_gen: Number of generations of the run.
+        '''
+
+        super().start(phi1, phi2, n_gen)
+        self.inertia = self.high
+
+    def step(self, generation, success):
+        '''
+        :param generation: The current generation. Not used by this kernel.
+        :param success: The fraction of the particles whose best position improved in this generation.
+        '''
+
+        self.inertia = self.low + (self.high - self.low) * success
+
+
+KERNELS = {"none": VelocityKernel, "linear": LinearInertia, "constriction": Constriction, "adaptive": AdaptiveInertia}
+
+
+def getKernel(kernel):
+    '''
+    :param kernel: A kernel object, or the name of one in KERNELS made with its default settings.
+    :return: Returns the kernel object.
+    '''
+
+    if isinstance(kernel, str):
+        try:
+            return KERNELS[kernel]()
+        except KeyError:
+            raise KeyError("Unknown velocity kernel %r, the known ones are: %s" % (kernel, ", ".join(sorted(KERNELS)))) from None
+    return kernel